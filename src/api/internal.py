@@ -0,0 +1,60 @@
+# 운영/모니터링용 내부 API
+# 모든 route에 verify_internal_access 적용 (include_in_schema=False 는 문서에서 숨기기만 함)
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from config import internal_settings
+from rate_limit import metrics as rate_limit_metrics
+from single_flight import single_flight
+from tiered_cache import missing_todo_cache, missing_user_cache, todo_list_cache, user_lookup_cache
+from database.connection import get_pool_status
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+# INTERNAL_TOKEN 이 있으면 Bearer token 비교, 없으면 loopback 에서 직접 온 요청만
+# (같은 서버의 reverse proxy가 전달한 요청도 client는 loopback 이므로 X-Forwarded-For 가 있으면 거부)
+async def verify_internal_access(request: Request) -> None:
+    if internal_settings.token:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(
+            token.encode("UTF-8"), internal_settings.token.encode("UTF-8")
+        ):
+            return
+    elif (
+        request.client is not None
+        and request.client.host in LOOPBACK_HOSTS
+        and "x-forwarded-for" not in request.headers
+    ):
+        return
+    raise HTTPException(status_code=403, detail="Forbidden")
+
+
+router = APIRouter(
+    prefix="/internal", include_in_schema=False, dependencies=[Depends(verify_internal_access)]
+)
+
+
+# DB connection pool 사용 현황
+@router.get("/pool", status_code=200)
+async def get_pool_status_handler():
+    return get_pool_status()
+
+
+# cache hit / miss (worker 단위)
+@router.get("/cache", status_code=200)
+async def get_cache_status_handler():
+    return {
+        "todo_list": todo_list_cache.to_dict(),
+        "user": user_lookup_cache.to_dict(),
+        "todo_missing": missing_todo_cache.to_dict(),
+        "user_missing": missing_user_cache.to_dict(),
+        "single_flight": single_flight.metrics.to_dict(),
+    }
+
+
+# 요청 수 제한 현황 (worker 단위)
+@router.get("/rate-limit", status_code=200)
+async def get_rate_limit_status_handler():
+    return rate_limit_metrics.to_dict()
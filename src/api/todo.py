@@ -1,22 +1,61 @@
 # API 분리 -  Router를 사용해 main.py에 연결
-from typing import List
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Literal, Tuple
 
-from fastapi import Body, HTTPException, Depends, APIRouter
+from fastapi import Body, HTTPException, Depends, APIRouter, Header, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Row
 
-from database.repository import ToDoRepository, UserRepository
+from tiered_cache import ToDoListCache, UserCache, missing_todo_cache
+from config import cache_settings, todo_settings
+from database.connection import UnitOfWorkRoute, run_after_commit
+from database.query_count import query_budget
+from database.storage import ToDoStorage, UserStorage, get_todo_repository, get_user_repository
 from database.orm import ToDo, User
 
-from schema.request import CreateToDoRequest
-from schema.response import ToDoListSchema, ToDoSchema
+from schema.request import BulkDeleteToDoRequest, BulkUpdateToDoRequest, CreateToDoRequest, ToDoFilter
+from schema.response import (
+    BulkDeleteToDoResponse,
+    BulkUpdateToDoResponse,
+    DailyCompletionSchema,
+    ImportErrorSchema,
+    ImportToDoResponse,
+    ToDoListSchema,
+    ToDoSchema,
+    ToDoStatsSchema,
+)
+from etag import etag_matches, find_todo_etag, make_list_etag, make_todo_etag
+from pagination import decode_cursor, decode_search_cursor, encode_cursor, encode_search_cursor
 from security import get_access_token
+from single_flight import single_flight
+from service.todo_import import iter_lines, parse_csv, parse_ndjson
 from service.user import UserService
 
 # API router객체 생성,@app -> router로 바꿈
 # main.py 코드도 router를 연결해주고, pytest 코드도 다 바꿔줘야함
-router = APIRouter(prefix='/todos')
+# route_class=UnitOfWorkRoute : 요청이 정상적으로 끝나면 응답 전에 DB commit 한 번
+router = APIRouter(prefix='/todos', route_class=UnitOfWorkRoute)
 # '/todos'
 # /todos가 모든 API에 들어감 -> router의 prefix기능 사용해서 한번에 바꿔줌
 
+# access token -> username -> user 조회 (인증이 필요한 API에서 공통으로 사용)
+async def get_current_user(
+        access_token : str = Depends(get_access_token),
+        user_service : UserService = Depends(),
+        user_repo : UserStorage = Depends(get_user_repository),
+        user_cache : UserCache = Depends(),
+    ) -> User:
+    username: str = user_service.decode_jwt(access_token=access_token)
+    # cache에 있으면 DB 조회 없음
+    user : User | None = await user_cache.get_user(username=username, user_repo=user_repo)
+    if not user:
+        raise HTTPException(status_code=404, detail="User Not Found")
+    return user
+
+
 # default 200 인데, 명시적으로 적어주는게 좋음
 @router.get("", status_code= 200) # resource는 복수형
 # query parameter 사용해보기 -> order
@@ -26,45 +65,324 @@ router = APIRouter(prefix='/todos')
 
 
 # GET API 전체조회
-def get_todos_handler(
-        access_token : str = Depends(get_access_token),
+# limit + cursor 로 keyset pagination, 정렬은 SQL의 ORDER BY 에서 처리
+# 쿼리 2번 (user 조회 + todo 목록), todo 개수와 관계없음 (user가 cache에 있으면 1번)
+@query_budget(2)
+async def get_todos_handler(
         order : str | None = None,
-        user_service : UserService = Depends(),
-        user_repo : UserRepository = Depends(),
-        todo_repo : ToDoRepository = Depends()
+        limit : int = Query(100, ge=1, le=1000),
+        cursor : str | None = None,
+        user : User = Depends(get_current_user),
+        todo_repo : ToDoStorage = Depends(get_todo_repository),
+        todo_cache : ToDoListCache = Depends(),
+        if_none_match : str | None = Header(None),
     )  -> ToDoListSchema :
 
-    username: str = user_service.decode_jwt(access_token=access_token)
-    user : User | None = user_repo.get_user_by_username(username=username)
+    order = "DESC" if order and order == "DESC" else "ASC"
+    after_id: int | None = None
+    if cursor:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Cursor")
 
-    if not user:
-        raise HTTPException(status_code=404, detail="User Not Found")
+    # cache hit -> 저장해둔 JSON을 그대로 응답 (DB 조회, 직렬화 없음)
+    params: str = f"{order}:{limit}:{cursor or ''}"
+    generation, cached = await todo_cache.get(user_id=user.id, params=params)
+    etag : str | None = None
+    if generation is not None:
+        # 클라이언트가 가진 목록과 같은 세대 -> 304 (body 없음)
+        etag = make_list_etag(user_id=user.id, generation=generation, params=params)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    if cached is not None:
+        return Response(content=cached, media_type="application/json", headers={"ETag": etag})
 
+    async def load_todo_list() -> ToDoListSchema:
+        # 한 개 더 읽어서 다음 페이지가 있는지 확인
+        todos: List[Row] = await todo_repo.get_todos_by_user_id(
+            user_id=user.id,
+            order=order,
+            limit=limit + 1,
+            after_id=after_id,
+        )
+        next_cursor: str | None = None
+        if len(todos) > limit:
+            todos = todos[:limit]
+            next_cursor = encode_cursor(todos[-1].id)
 
-    # ret = list(todo_data.values())
-    # if order and order == "DESC" :
-    #     return ret[::-1]
-    # return ret
-    # DB사용해서 조회해보기
-    todos: List[ToDo] = user.todos
-    if order and order == "DESC" :
         return ToDoListSchema(
-        todos = [ToDoSchema.from_orm(todo) for todo in todos[::-1]]
+            todos = [ToDoSchema.from_orm(todo) for todo in todos],
+            next_cursor = next_cursor,
         )
+
+    if generation is None:
+        return await load_todo_list()
+
+    async def fill_todo_list() -> str:
+        # 세대는 쓰기의 commit 이후에 증가 -> replica가 늦게 반영되면 이전 목록이 새 세대로 저장되므로 primary에서 읽음
+        todo_repo.read_from_primary()
+        body : str = (await load_todo_list()).json()
+        await todo_cache.set(user_id=user.id, generation=generation, params=params, value=body)
+        return body
+
+    async def poll_todo_list() -> str | None:
+        return (await todo_cache.get(user_id=user.id, params=params))[1]
+
+    # cache miss -> 같은 user, 같은 세대, 같은 query parameter의 동시 요청은 DB 조회 / 직렬화를 한 번만
+    # (세대가 key에 들어가므로 쓰기 이후에 온 요청이 쓰기 이전의 결과를 받지 않음)
+    body : str = await single_flight.do(
+        key=f"todos:{user.id}:{generation}:{params}", func=fill_todo_list, poll=poll_todo_list
+    )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+# todo 목록이 바뀌면 commit 후에 해당 user의 목록 cache 무효화
+def _invalidate_todo_list(request : Request, todo_cache : ToDoListCache, user_id : int | None) -> None:
+    if user_id is not None:
+        run_after_commit(request, lambda: todo_cache.invalidate(user_id=user_id))
+
+
+# GET API 통계 (완료/미완료 개수) -> 목록 전체를 내려받아서 세지 않아도 됨
+# /{todo_id} 보다 먼저 등록해야 "stats"가 todo_id로 해석되지 않음
+@router.get("/stats", status_code=200)
+@query_budget(3)
+async def get_todo_stats_handler(
+    days : int | None = Query(None, ge=1, le=366),  # 최근 며칠의 일별 완료 수 (선택)
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository)
+) -> ToDoStatsSchema:
+    counts : Dict[bool, int] = await todo_repo.get_todo_stats(user_id=user.id)
+    daily_completions : List[DailyCompletionSchema] | None = None
+    if days:
+        since : date = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        daily_completions = [
+            DailyCompletionSchema.from_orm(completion)
+            for completion in await todo_repo.get_daily_completions(user_id=user.id, since=since)
+        ]
+    return ToDoStatsSchema(
+        total=counts.get(True, 0) + counts.get(False, 0),
+        done=counts.get(True, 0),
+        pending=counts.get(False, 0),
+        daily_completions=daily_completions,
+    )
+
+
+# GET API 검색 -> 관련도 순, cursor pagination
+@router.get("/search", status_code=200)
+@query_budget(2)
+async def search_todos_handler(
+    q : str = Query(..., min_length=1, max_length=256),
+    limit : int = Query(100, ge=1, le=1000),
+    cursor : str | None = None,
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository)
+) -> ToDoListSchema:
+    after : tuple[float, int] | None = None
+    if cursor:
+        try:
+            after = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Cursor")
+
+    todos : List[Row] = await todo_repo.search_todos(
+        user_id=user.id, query=q, limit=limit + 1, after=after
+    )
+    next_cursor : str | None = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_cursor = encode_search_cursor(float(todos[-1].score), todos[-1].id)
+
     return ToDoListSchema(
-        todos = [ToDoSchema.from_orm(todo) for todo in todos]
+        todos = [ToDoSchema.from_orm(todo) for todo in todos],
+        next_cursor = next_cursor,
+    )
+
+
+# GET API export -> 조회되는 대로 바로 응답으로 흘려보냄 (StreamingResponse)
+# 한 번에 todo 전체를 메모리에 올리지 않으므로 todo가 많아도 메모리 사용량이 일정함
+@router.get("/export", status_code=200)
+async def export_todos_handler(
+    format : Literal["ndjson", "csv"] = "ndjson",
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository)
+) -> StreamingResponse:
+    rows : AsyncIterator[List[Row]] = todo_repo.stream_todos_by_user_id(
+        user_id=user.id, batch_size=todo_settings.export_batch_size
     )
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="todos.csv"'},
+        )
+    return StreamingResponse(_export_ndjson(rows), media_type="application/x-ndjson")
+
+
+async def _export_ndjson(rows : AsyncIterator[List[Row]]) -> AsyncIterator[str]:
+    async for batch in rows:
+        yield "".join(
+            json.dumps({"id": row.id, "contents": row.contents, "is_done": bool(row.is_done)},
+                       ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+
+async def _export_csv(rows : AsyncIterator[List[Row]]) -> AsyncIterator[str]:
+    yield "id,contents,is_done\r\n"  # header는 바로 보냄
+    async for batch in rows:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (row.id, row.contents, bool(row.is_done)) for row in batch
+        )
+        yield buffer.getvalue()
+
+
+# POST API import (NDJSON / CSV 업로드) -> body를 조금씩 읽으면서 N건마다 multi-row INSERT
+# 파일 전체나 ORM 객체 전체를 메모리에 올리지 않음
+# 쿼리 수는 batch 수에 비례 -> query budget 검사 안함
+@router.post("/import", status_code=200)
+@query_budget(None)
+async def import_todos_handler(
+    request : Request,
+    format : Literal["ndjson", "csv"] = "ndjson",
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
+) -> ImportToDoResponse:
+    batch : List[dict] = []
+    imported : int = 0
+    failed : int = 0
+    errors : List[ImportErrorSchema] = []
+
+    max_length : int = todo_settings.import_max_line_length
+    lines = iter_lines(request.stream(), max_length=max_length)
+    parsed_lines = parse_csv(lines, max_length=max_length) if format == "csv" else parse_ndjson(lines)
+    async for line_no, parsed in parsed_lines:
+        if isinstance(parsed, str):
+            failed += 1
+            if len(errors) < todo_settings.import_max_errors:
+                errors.append(ImportErrorSchema(line=line_no, error=parsed))
+            continue
+        batch.append({"contents": parsed.contents, "is_done": parsed.is_done, "user_id": user.id})
+        if len(batch) >= todo_settings.import_batch_size:
+            imported += await todo_repo.insert_todo_rows(rows=batch)
+            batch = []
+    imported += await todo_repo.insert_todo_rows(rows=batch)
+
+    if imported:
+        _invalidate_todo_list(request, todo_cache, user_id=user.id)
+        # 새로 생긴 id를 모르므로 "없음" cache 전체 제거
+        run_after_commit(request, missing_todo_cache.clear)
+    return ImportToDoResponse(imported=imported, failed=failed, errors=errors)
+
+
+# PATCH API 여러 개 수정 (ex. 모두 완료 처리) -> UPDATE 한 번
+# 쿼리 3번 (user 조회 + UPDATE + 일별 완료 수 upsert), 수정되는 todo 개수와 관계없음
+@router.patch("", status_code=200)
+@query_budget(3)
+async def update_todos_handler(
+    request : BulkUpdateToDoRequest,
+    http_request : Request,
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
+) -> BulkUpdateToDoResponse:
+    _validate_filter(request.filter)
+    updated: int = await todo_repo.update_todos(
+        user_id=user.id,
+        set_is_done=request.is_done,
+        ids=request.filter.ids,
+        is_done=request.filter.is_done,
+    )
+    if updated:
+        _invalidate_todo_list(http_request, todo_cache, user_id=user.id)
+    return BulkUpdateToDoResponse(updated=updated)
+
+
+# DELETE API 여러 개 삭제 (ex. 완료된 todo 모두 삭제) -> DELETE 한 번
+@router.delete("", status_code=200)
+@query_budget(2)
+async def delete_todos_handler(
+    request : BulkDeleteToDoRequest,
+    http_request : Request,
+    user : User = Depends(get_current_user),
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
+) -> BulkDeleteToDoResponse:
+    _validate_filter(request.filter)
+    deleted: int = await todo_repo.delete_todos(
+        user_id=user.id, ids=request.filter.ids, is_done=request.filter.is_done
+    )
+    if deleted:
+        _invalidate_todo_list(http_request, todo_cache, user_id=user.id)
+    return BulkDeleteToDoResponse(deleted=deleted)
+
+
+# 조건 없이 전체가 수정/삭제되는 것을 막음
+def _validate_filter(todo_filter : ToDoFilter) -> None:
+    if todo_filter.ids is None and todo_filter.is_done is None:
+        raise HTTPException(status_code=400, detail="Empty Filter")
+    if todo_filter.ids is not None and len(todo_filter.ids) > todo_settings.bulk_max_items:
+        raise HTTPException(status_code=413, detail="Too Many ToDos")
 
 
 # GET API 단일 조회  {} : sub path
+# ETag의 세대는 todo를 읽기 "전"에 읽어야 함
+# (읽은 후에 세대를 읽으면, 그 사이에 commit 된 쓰기의 새 세대가 이전 내용에 붙어서 이후 조건부 요청이 계속 304)
+# 소유자는 바뀌지 않으므로 If-None-Match 의 ETag 에 들어있는 소유자의 세대를 먼저 읽음
+# 소유자를 모르는 첫 조회는 todo를 읽어서 소유자를 알아낸 후, 세대를 읽고 한 번 더 읽음 (쿼리 2번)
 @router.get("/{todo_id}" , status_code= 200)
-def get_todo_handler(
+@query_budget(2)
+async def get_todo_handler(
     todo_id : int,
-    todo_repo : ToDoRepository = Depends()
+    response : Response,
+    if_none_match : str | None = Header(None),
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
     ) -> ToDoSchema:
-    todo : ToDo | None = todo_repo.get_todo_by_todo_id(todo_id=todo_id)
+    owner_id : int | None = None
+    generation : str | None = None
+    # ETag에 들어있는 소유자의 세대가 그대로면 304 (DB 조회 없음)
+    cached_etag : Tuple[int, str] | None = find_todo_etag(if_none_match, todo_id=todo_id)
+    if cached_etag:
+        owner_id, cached_generation = cached_etag
+        generation = await todo_cache.get_generation(user_id=owner_id)
+        if generation == cached_generation:
+            return Response(
+                status_code=304,
+                headers={"ETag": make_todo_etag(todo_id=todo_id, user_id=owner_id, generation=generation)},
+            )
+
+    # 최근에 없었던 todo (ex. 삭제된 id 재조회) -> DB 조회 없이 404
+    if missing_todo_cache.is_missing(str(todo_id)):
+        raise HTTPException(status_code=404, detail="Todo Not Found")
+    missing_sequence : int = missing_todo_cache.sequence
+
+    # ETag를 붙일 내용은 replica lag 없이 primary에서 읽음
+    if generation is not None:
+        todo_repo.read_from_primary()
+    todo : ToDo | None = await todo_repo.get_todo_by_todo_id(todo_id=todo_id)
+    if todo and todo.user_id is not None and todo.user_id != owner_id:
+        generation = await todo_cache.get_generation(user_id=todo.user_id)
+        if generation is not None:
+            todo_repo.read_from_primary()
+            todo = await todo_repo.get_todo_by_todo_id(todo_id=todo_id)
+
     if todo:
+        # 소유자가 없는 todo는 세대가 없음 -> ETag 없이 응답
+        if todo.user_id is not None and generation is not None:
+            response.headers["ETag"] = make_todo_etag(
+                todo_id=todo_id, user_id=todo.user_id, generation=generation
+            )
         return ToDoSchema.from_orm(todo)
+    # replica에서 없었으면 lag 때문일 수 있으므로 primary에서 다시 확인한 후에 "없음" 저장
+    if generation is None and cache_settings.enabled:
+        todo_repo.read_from_primary()
+        todo = await todo_repo.get_todo_by_todo_id(todo_id=todo_id)
+        if todo:
+            return ToDoSchema.from_orm(todo)
+    missing_todo_cache.set_missing(str(todo_id), missing_sequence)
     raise HTTPException(status_code=404, detail="Todo Not Found")
 
 
@@ -76,31 +394,54 @@ def get_todo_handler(
 
 # pydantic으로 받은 데이터를 orm으로 생성해줘야함
 @router.post("", status_code=201)  # 생성 상태코드는 201
-def create_todo_handler(
+async def create_todo_handler(
     request : CreateToDoRequest,
-    todo_repo : ToDoRepository = Depends()
+    http_request : Request,
+    todo_repo : ToDoStorage = Depends(get_todo_repository)
 ) -> ToDoSchema:
     todo : ToDo = ToDo.create(request=request)  # id 없음
-    todo : ToDo = todo_repo.create_todo(todo = todo)  # DB에 넣어졌다가 다시 나와서(refresh) id 생성되어 있음
+    todo : ToDo = await todo_repo.create_todo(todo = todo)  # DB에 넣어졌다가 다시 나와서(refresh) id 생성되어 있음
+    # id가 재사용되는 경우(ex. SQLite 의 마지막 rowid) "없음"으로 저장된 id일 수 있음
+    todo_id : str = str(todo.id)
+    run_after_commit(http_request, lambda: missing_todo_cache.invalidate(todo_id))
     return ToDoSchema.from_orm(todo)
 # DB 에 이렇게 데이터 넣어주면, server를 내렸다가 올려도 데이터가 유지됨.
 
 
+# POST API 여러 개 생성 -> request 1번, transaction 1번으로 처리
+# 쿼리 수는 batch 수에 비례 -> query budget 검사 안함
+@router.post("/bulk", status_code=201)
+@query_budget(None)
+async def create_todos_handler(
+    request : List[CreateToDoRequest],
+    http_request : Request,
+    todo_repo : ToDoStorage = Depends(get_todo_repository)
+) -> List[ToDoSchema]:
+    if len(request) > todo_settings.bulk_max_items:
+        raise HTTPException(status_code=413, detail="Too Many ToDos")
+    todos : List[ToDo] = [ToDo.create(request=todo_request) for todo_request in request]
+    todos : List[ToDo] = await todo_repo.create_todos(
+        todos=todos, batch_size=todo_settings.bulk_batch_size
+    )
+    run_after_commit(http_request, missing_todo_cache.clear)
+    return [ToDoSchema.from_orm(todo) for todo in todos]
+
+
 # PATCH API - 수정
 @router.patch("/{todo_id}", status_code=200 )
-def update_todo_handler(
+async def update_todo_handler(
     todo_id : int,
+    request : Request,
     is_done : bool = Body(..., embed = True),  #  ... 이니깐 required,
     # fast api는 리퀘스트 바디가 하나밖에 없으면 키값을 생략하고 리퀘스트 바디 안의 데이터만 해석하도록 되어있다.
     # ->  리퀘스트 바디의 key값을 넣어주고 싶다면 embed = True
-    todo_repo : ToDoRepository = Depends()
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
 ):
-    todo : ToDo | None = todo_repo.get_todo_by_todo_id(todo_id=todo_id)
-    # orm.py에 done, undone 메소드로 is_done 인스턴스 가져와서 변경
+    # SELECT -> UPDATE -> refresh 대신 UPDATE 한 번 (+ 응답용 조회)
+    todo : Row | None = await todo_repo.update_todo_is_done(todo_id=todo_id, is_done=is_done)
     if todo:
-        # update
-        todo.done() if is_done else todo.undone() # 여기서 DB까지 수정된건 아님 -> repository에 함수 추가
-        todo : ToDo = todo_repo.update_todo(todo = todo) 
+        _invalidate_todo_list(request, todo_cache, user_id=todo.user_id)
         return ToDoSchema.from_orm(todo)
     raise HTTPException(status_code=404, detail="Todo Not Found")
 
@@ -110,15 +451,20 @@ def update_todo_handler(
 
 # DELETE API - 삭제
 @router.delete("/{todo_id}", status_code= 204)  #204는 응답되는 body가 없음
-def delete_todo_handler(
+async def delete_todo_handler(
     todo_id : int,
-    todo_repo : ToDoRepository = Depends()
+    request : Request,
+    todo_repo : ToDoStorage = Depends(get_todo_repository),
+    todo_cache : ToDoListCache = Depends(),
 ):
-    todo : ToDo | None = todo_repo.get_todo_by_todo_id(todo_id=todo_id)
-    if not todo:
+    # 삭제된 row가 없으면 404
+    # 소유자(user_id)는 목록 cache 무효화에만 필요 -> cache를 쓰지 않으면 조회하지 않음 (MySQL 에서 DELETE 한 번)
+    deleted : Row | None = await todo_repo.delete_todo(
+        todo_id=todo_id, with_owner=cache_settings.enabled
+    )
+    if not deleted:
         raise HTTPException(status_code=404, detail="Todo Not Found")
-    # delete
-    todo_repo.delete_todo(todo_id=todo_id)
+    _invalidate_todo_list(request, todo_cache, user_id=deleted.user_id)
 # 정상으로 삭제되면 204 코드 뜸
  
 
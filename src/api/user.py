@@ -1,26 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from starlette.concurrency import run_in_threadpool
 
-from database.repository import UserRepository
+from database.connection import UnitOfWorkRoute, run_after_commit
+from database.storage import UserStorage, get_user_repository
 from schema.request import SignUpRequest, LogInRequest, CreateOTPRequest, VerifyOTPRequest
 from schema.response import UserSchema, JWTResponse
 from service.user import UserService
-from database.orm import User
+from database.orm import DuplicateUsernameError, User
 from security import get_access_token
 from cache import redis_client
+from rate_limit import RateLimit
+from tiered_cache import UserCache, find_user
 
-router = APIRouter(prefix="/users")
+router = APIRouter(prefix="/users", route_class=UnitOfWorkRoute)
 
-@router.post("/sign-up", status_code=201)
-def user_sign_up_handler(
+# 로그인 / 회원가입은 bcrypt 때문에 비쌈 -> IP, username 별 요청 수 제한 (넘으면 DB 조회, bcrypt 전에 429)
+@router.post("/sign-up", status_code=201, dependencies=[Depends(RateLimit("sign-up"))])
+async def user_sign_up_handler(
     request: SignUpRequest,
+    http_request: Request,
     user_service: UserService = Depends(),
-    user_repo: UserRepository = Depends()
+    user_repo: UserStorage = Depends(get_user_repository),
+    user_cache: UserCache = Depends()
     ):
     # 1. request body(username, password)
     # hashing위한 라이브러리 설치 : pip install bcrypt
     # 2. password -> hasing -> hashed_password
     # aaa -> hash -> asdfqwefj => 개발자도 비번 모르게 됨...
-    hashed_password: str = user_service.hash_password(plain_password=request.password)
+    # bcrypt는 CPU를 오래 쓰므로 event loop를 막지 않도록 threadpool에서 실행
+    hashed_password: str = await run_in_threadpool(
+        user_service.hash_password, plain_password=request.password
+    )
     
     # 3. User(username, hashed_password) -> ORM user객체 생성
     user: User = User.create(
@@ -29,27 +39,34 @@ def user_sign_up_handler(
     )
 
     # 4. user -> db save
-    user: User = user_repo.save_user(user=user)  # id=int
+    try:
+        user: User = await user_repo.save_user(user=user)  # id=int
+    except DuplicateUsernameError:
+        raise HTTPException(status_code=409, detail="Username Already Exists")
+    # commit 후에 인증용 user cache, "없음" cache 에서 제거
+    run_after_commit(http_request, lambda: user_cache.invalidate(username=user.username))
 
     # 5. return user(id, username)
     return UserSchema.from_orm(user)
 
  
-@router.post("/log-in")
-def user_log_in_handler(
+@router.post("/log-in", dependencies=[Depends(RateLimit("log-in"))])
+async def user_log_in_handler(
     request: LogInRequest,
-    user_repo: UserRepository = Depends(),
+    user_repo: UserStorage = Depends(get_user_repository),
     user_service: UserService = Depends()
 ):
     # 1. request body(username, password)
     # 2. db read user
-    user: User | None = user_repo.get_user_by_username(username=request.username)
+    # 최근에 없었던 username -> DB 조회 없이 404
+    user: User | None = await find_user(username=request.username, user_repo=user_repo)
     
     if not user:
         raise HTTPException(status_code=404, detail="User Not Found")
     
     # 3. user.password, reques.password -> bcrypt.checkpw
-    verified: bool = user_service.verify_password(
+    verified: bool = await run_in_threadpool(
+        user_service.verify_password,
         plain_password=request.password,
         hashed_password=user.password
     )
@@ -81,7 +98,7 @@ def user_log_in_handler(
 # POST / users/email/otp/verfiy -> request(email, otp) -> user(email)
 
 @router.post("/email/otp")
-def create_otp_handler(
+async def create_otp_handler(
     request: CreateOTPRequest,
     _: str = Depends(get_access_token),   #header에 검증만하고 사용은 안하니가 _ 처리
     user_service: UserService = Depends()
@@ -92,24 +109,25 @@ def create_otp_handler(
     otp: str = user_service.create_otp()
 
     # 4. redis otp(email, 1234, exp=3min)
-    redis_client.set(request.email, otp)
-    redis_client.expire(request.email, 3 * 60)
+    # SET + EXPIRE 대신 SET EX 한 번 (round-trip 1번, 만료 시간 없이 남는 경우 없음)
+    await redis_client.set(request.email, otp, ex=3 * 60)
     # 5. send otp to email
     return {"otp":otp}
 
 
 @router.post("/email/otp/verify")
-def verify_otp_handler(
+async def verify_otp_handler(
     request: VerifyOTPRequest,
     background_tasks: BackgroundTasks,
     access_token: str = Depends(get_access_token),
     user_service: UserService = Depends(),
-    user_repo: UserRepository = Depends()
+    user_repo: UserStorage = Depends(get_user_repository),
+    user_cache: UserCache = Depends()
 ):
     # 1. access_token 검증
     # 2. request body(email, otp)   
     # 3. request.otp == redis.get(email)
-    otp: str | None = redis_client.get(request.email)
+    otp: str | None = await redis_client.get(request.email)
     if not otp:
         raise HTTPException(status_code=400, detail="Bad Request")
     
@@ -117,7 +135,7 @@ def verify_otp_handler(
         raise HTTPException(status_code=400, detail="Bad Request")
     # 4. user(email)
     username: str = user_service.decode_jwt(access_token=access_token)
-    user: User | None = user_repo.get_user_by_username(username)
+    user: User | None = await user_cache.get_user(username=username, user_repo=user_repo)
     if not user:
         raise HTTPException(status_code=404, detail="User Not Found")
     
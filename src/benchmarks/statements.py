@@ -0,0 +1,66 @@
+# 조회 statement 재사용(prebuilt) 효과 측정
+# src 폴더에서 실행 : python -m benchmarks.statements [반복 횟수]
+#
+# 1. statement 생성 + cache key 계산 비용 (DB 없이)
+# 2. 실제 조회 (sqlite in-memory, AsyncSession) 1회당 시간 -> DB_PREBUILT_STATEMENTS on / off 비교
+import asyncio
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from config import database_settings
+from database.orm import Base, ToDo, User
+from database.repository import (
+    GET_TODO_BY_TODO_ID,
+    GET_USER_BY_USERNAME,
+    ToDoRepository,
+    UserRepository,
+    _build_get_todo_by_todo_id,
+    _build_get_user_by_username,
+)
+
+
+def bench_build(iterations: int) -> None:
+    cases = [
+        ("get_todo_by_todo_id", GET_TODO_BY_TODO_ID, _build_get_todo_by_todo_id),
+        ("get_user_by_username", GET_USER_BY_USERNAME, _build_get_user_by_username),
+    ]
+    for name, prebuilt, build in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build()._generate_cache_key()
+        rebuilt = (time.perf_counter() - start) / iterations
+        start = time.perf_counter()
+        for _ in range(iterations):
+            prebuilt._generate_cache_key()
+        reused = (time.perf_counter() - start) / iterations
+        print(f"[build + cache key] {name:22} rebuild {rebuilt * 1e6:7.2f}us  prebuilt {reused * 1e6:7.2f}us")
+
+
+async def bench_query(iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(User(id=1, username="test", password="hashed"))
+        session.add(ToDo(id=1, contents="todo", is_done=False, user_id=1))
+        await session.commit()
+
+        todo_repo = ToDoRepository(session=session)
+        user_repo = UserRepository(session=session)
+        for prebuilt in (False, True):
+            database_settings.prebuilt_statements = prebuilt
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await todo_repo.get_todo_by_todo_id(todo_id=1)
+                await user_repo.get_user_by_username(username="test")
+            elapsed = (time.perf_counter() - start) / (iterations * 2)
+            print(f"[query] prebuilt_statements={prebuilt!s:5}  {elapsed * 1e6:7.2f}us / query")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    bench_build(iterations)
+    asyncio.run(bench_query(iterations))
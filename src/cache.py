@@ -1,4 +1,162 @@
+import time
+from collections import OrderedDict
+from typing import Any, List, Tuple
+
 import redis
+from redis import asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+from config import RedisSettings
+
+
+# redis.asyncio client -> Redis I/O를 기다리는 동안 event loop / threadpool 쓰레드를 잡고 있지 않음
+# connection pool 크기와 timeout을 명시 (pool이 가득 차면 pool_timeout 까지 기다림)
+def create_redis_client(settings: RedisSettings) -> aioredis.Redis:
+    pool = aioredis.BlockingConnectionPool(
+        host=settings.host,
+        port=settings.port,
+        db=settings.db,
+        max_connections=settings.max_connections,
+        timeout=settings.pool_timeout,
+        socket_timeout=settings.socket_timeout,
+        socket_connect_timeout=settings.socket_connect_timeout,
+        health_check_interval=settings.health_check_interval,
+        encoding="UTF-8",
+        decode_responses=True,
+    )
+    return aioredis.Redis(connection_pool=pool)
+
+
+# Lua script : 모듈 import 시에는 source만 등록, client가 열릴 때 client에 등록
+class RedisScript:
+    def __init__(self, source: str):
+        self.source: str = source
+        self.script: AsyncScript | None = None
+
+    async def __call__(self, keys: List[str], args: List[Any]) -> Any:
+        if self.script is None:
+            raise redis.ConnectionError("redis client is not open")
+        return await self.script(keys=keys, args=args)
+
+
+# worker(프로세스) 하나의 Redis client 보관
+# pool / client는 import 시점이 아니라 app lifespan 에서 open() 으로 만들고 close() 로 정리
+# (import만 하는 테스트, 스크립트에서는 연결 설정이 필요 없음 / 같은 event loop 에서 생성, 종료)
+# 열리기 전에 사용하면 redis.ConnectionError -> 다른 Redis 에러와 같이 cache 없이 처리
+class RedisClient:
+    def __init__(self):
+        self._client: aioredis.Redis | None = None
+        self._scripts: List[RedisScript] = []
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            raise redis.ConnectionError("redis client is not open")
+        return self._client
+
+    # redis_client.get(...) 처럼 redis.asyncio client의 명령을 그대로 사용
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def script(self, source: str) -> RedisScript:
+        script = RedisScript(source)
+        self._scripts.append(script)
+        if self._client is not None:
+            script.script = self._client.register_script(source)
+        return script
+
+    def open(self, settings: RedisSettings) -> None:
+        # connection은 처음 사용할 때 연결됨
+        self._client = create_redis_client(settings)
+        for script in self._scripts:
+            script.script = self._client.register_script(script.source)
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        client, self._client = self._client, None
+        for script in self._scripts:
+            script.script = None
+        # connection_pool을 직접 만들어서 넘긴 경우 pool까지 닫도록 지정해야 connection이 정리됨
+        await client.aclose(close_connection_pool=True)
+
+
+redis_client = RedisClient()
+
+
+# cache 사용 현황 (프로세스 단위)
+class CacheMetrics:
+    def __init__(self):
+        self.hits: int = 0
+        self.misses: int = 0
+        self.errors: int = 0
+        self.invalidations: int = 0
+        self.evictions: int = 0  # 최대 개수를 넘어서 밀려난 수 (local cache)
+
+    def to_dict(self) -> dict:
+        lookups: int = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+MISSING = object()
+
+
+# 프로세스(worker) 메모리 안의 cache -> 최대 개수(LRU로 밀어냄) + TTL
+# 하나의 event loop 에서 await 없이 처리하므로 lock 필요 없음
+class LocalCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.metrics = CacheMetrics()
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()  # key -> (만료 시각, 값)
+
+    def get(self, key: str) -> Any:
+        entry: Tuple[float, Any] | None = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.metrics.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)  # 최근에 사용 -> 가장 늦게 밀려남
+        self.metrics.hits += 1
+        return entry[1]
+
+    # 사용 현황(hit/miss), LRU 순서에 반영하지 않고 조회
+    def peek(self, key: str) -> Any:
+        entry: Tuple[float, Any] | None = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return MISSING
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
+
+    def delete(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self.metrics.invalidations += 1
 
-redis_client = redis.Redis(host="127.0.0.1", port=6379, db=0, encoding="UTF-8", decode_responses=True)
+    def clear(self) -> None:
+        self._entries.clear()
 
+    def to_dict(self) -> dict:
+        return {
+            **self.metrics.to_dict(),
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,260 @@
+# In-memory 저장소 (DB_BACKEND=memory)
+# MySQL 없이 dict + 정렬된 id 목록(bisect)으로 ToDoRepository / UserRepository 와 같은 method를 제공
+# 데이터는 프로세스(uvicorn worker) 안에만 있고 재시작하면 사라짐 -> 테스트, 벤치마크, 소규모 배포용
+import bisect
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Dict, List, Tuple
+
+from database.orm import DuplicateUsernameError, ToDo, ToDoDailyCompletion, User
+
+# SQL 저장소의 Row(id, contents, is_done) 와 같은 모양
+ToDoRow = namedtuple(
+    "ToDoRow", ["id", "contents", "is_done", "user_id", "completed_on"], defaults=[None]
+)
+SearchRow = namedtuple("SearchRow", ["id", "contents", "is_done", "score"])
+
+
+class MemoryStore:
+    def __init__(self):
+        self.todos: Dict[int, ToDoRow] = {}
+        self.todo_ids_by_user: Dict[int | None, List[int]] = {}  # user 별 todo id (오름차순 정렬)
+        self.users: Dict[int, Tuple[str, str]] = {}  # id -> (username, password)
+        self.user_ids_by_username: Dict[str, int] = {}
+        self.daily_completions: Dict[Tuple[int, date], int] = {}
+        self.last_todo_id: int = 0
+        self.last_user_id: int = 0
+
+    def clear(self) -> None:
+        self.__init__()
+
+
+# 같은 프로세스의 모든 요청이 공유
+store = MemoryStore()
+
+
+# 일별 완료 수의 날짜 기준 (UTC)
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# async method 안에서 await 없이 처리하므로 하나의 event loop 에서는 method 단위로 원자적
+class MemoryToDoRepository:
+    def __init__(self):
+        self.store = store
+
+    # replica가 없음
+    def read_from_primary(self) -> None:
+        pass
+
+    async def get_todos(self) -> List[ToDo]:
+        return [self._to_orm(row) for row in self.store.todos.values()]
+
+    async def get_todos_by_user_id(
+        self,
+        user_id: int,
+        order: str = "ASC",
+        limit: int = 100,
+        after_id: int | None = None,
+    ) -> List[ToDoRow]:
+        ids: List[int] = self.store.todo_ids_by_user.get(user_id, [])
+        if order == "DESC":
+            end: int = len(ids) if after_id is None else bisect.bisect_left(ids, after_id)
+            page: List[int] = ids[max(end - limit, 0):end][::-1]
+        else:
+            start: int = 0 if after_id is None else bisect.bisect_right(ids, after_id)
+            page: List[int] = ids[start:start + limit]
+        return [self.store.todos[todo_id] for todo_id in page]
+
+    async def stream_todos_by_user_id(
+        self, user_id: int, batch_size: int = 1000
+    ) -> AsyncIterator[List[ToDoRow]]:
+        after_id: int | None = None
+        while True:
+            rows: List[ToDoRow] = await self.get_todos_by_user_id(
+                user_id=user_id, limit=batch_size, after_id=after_id
+            )
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1].id
+
+    async def get_todo_by_todo_id(self, todo_id: int) -> ToDo | None:
+        row: ToDoRow | None = self.store.todos.get(todo_id)
+        return self._to_orm(row) if row else None
+
+    async def create_todo(self, todo: ToDo) -> ToDo:
+        todo.id = self._insert(contents=todo.contents, is_done=todo.is_done, user_id=todo.user_id)
+        todo.completed_on = self.store.todos[todo.id].completed_on
+        return todo
+
+    async def create_todos(self, todos: List[ToDo], batch_size: int = 500) -> List[ToDo]:
+        for todo in todos:
+            await self.create_todo(todo=todo)
+        return todos
+
+    async def insert_todo_rows(self, rows: List[dict]) -> int:
+        for row in rows:
+            self._insert(contents=row["contents"], is_done=row["is_done"], user_id=row["user_id"])
+        return len(rows)
+
+    async def update_todo(self, todo: ToDo) -> ToDo:
+        row: ToDoRow | None = self.store.todos.get(todo.id)
+        if row:
+            row = self._set_is_done(row, is_done=todo.is_done)
+            self.store.todos[todo.id] = row._replace(contents=todo.contents)
+            todo.completed_on = row.completed_on
+        return todo
+
+    async def update_todo_is_done(self, todo_id: int, is_done: bool) -> ToDoRow | None:
+        row: ToDoRow | None = self.store.todos.get(todo_id)
+        if row is None:
+            return None
+        return self._set_is_done(row, is_done=is_done)
+
+    async def delete_todo(self, todo_id: int, with_owner: bool = True) -> ToDoRow | None:
+        row: ToDoRow | None = self.store.todos.pop(todo_id, None)
+        if row is not None:
+            self._remove_id(row)
+        return row
+
+    async def update_todos(
+        self,
+        user_id: int,
+        set_is_done: bool,
+        ids: List[int] | None = None,
+        is_done: bool | None = None,
+    ) -> int:
+        updated: int = 0
+        for row in self._filter_todos(user_id=user_id, ids=ids, is_done=is_done):
+            if row.is_done != set_is_done:
+                self._set_is_done(row, is_done=set_is_done)
+                updated += 1
+        return updated
+
+    async def delete_todos(
+        self, user_id: int, ids: List[int] | None = None, is_done: bool | None = None
+    ) -> int:
+        rows: List[ToDoRow] = self._filter_todos(user_id=user_id, ids=ids, is_done=is_done)
+        for row in rows:
+            del self.store.todos[row.id]
+            self._remove_id(row)
+        return len(rows)
+
+    # 단어별 포함 개수를 score로 사용 (SQL 저장소의 LIKE 검색과 같은 결과)
+    async def search_todos(
+        self,
+        user_id: int,
+        query: str,
+        limit: int = 100,
+        after: tuple[float, int] | None = None,
+    ) -> List[SearchRow]:
+        terms: List[str] = query.split() or [query]
+        matches: List[SearchRow] = []
+        for todo_id in self.store.todo_ids_by_user.get(user_id, []):
+            row: ToDoRow = self.store.todos[todo_id]
+            score: int = sum(1 for term in terms if term in row.contents)
+            if score and (after is None or (score, row.id) < after):
+                matches.append(SearchRow(row.id, row.contents, row.is_done, score))
+        matches.sort(key=lambda match: (match.score, match.id), reverse=True)
+        return matches[:limit]
+
+    async def get_todo_stats(self, user_id: int) -> Dict[bool, int]:
+        stats: Dict[bool, int] = {}
+        for todo_id in self.store.todo_ids_by_user.get(user_id, []):
+            is_done: bool = self.store.todos[todo_id].is_done
+            stats[is_done] = stats.get(is_done, 0) + 1
+        return stats
+
+    async def get_daily_completions(self, user_id: int, since: date) -> List[ToDoDailyCompletion]:
+        return [
+            ToDoDailyCompletion(user_id=completion_user_id, day=day, completed=completed)
+            for (completion_user_id, day), completed in sorted(self.store.daily_completions.items())
+            if completion_user_id == user_id and day >= since
+        ]
+
+    # SQL 저장소와 같이 완료되면 오늘 +1, 완료 취소되면 완료한 날(completed_on) -1
+    def _set_is_done(self, row: ToDoRow, is_done: bool) -> ToDoRow:
+        if row.is_done == is_done:
+            return row
+        if is_done:
+            row = row._replace(is_done=True, completed_on=_today())
+            self._add_completions(user_id=row.user_id, delta=1, day=row.completed_on)
+        else:
+            row = row._replace(is_done=False)
+            if row.completed_on is not None:
+                self._add_completions(user_id=row.user_id, delta=-1, day=row.completed_on)
+        self.store.todos[row.id] = row
+        return row
+
+    def _insert(self, contents: str, is_done: bool, user_id: int | None) -> int:
+        self.store.last_todo_id += 1
+        todo_id: int = self.store.last_todo_id
+        completed_on: date | None = _today() if is_done else None
+        self.store.todos[todo_id] = ToDoRow(todo_id, contents, is_done, user_id, completed_on)
+        if is_done:
+            self._add_completions(user_id=user_id, delta=1, day=completed_on)
+        # id는 계속 증가하므로 정렬된 목록의 끝에 추가됨
+        self.store.todo_ids_by_user.setdefault(user_id, []).append(todo_id)
+        return todo_id
+
+    def _remove_id(self, row: ToDoRow) -> None:
+        ids: List[int] = self.store.todo_ids_by_user.get(row.user_id, [])
+        index: int = bisect.bisect_left(ids, row.id)
+        if index < len(ids) and ids[index] == row.id:
+            del ids[index]
+
+    def _filter_todos(
+        self, user_id: int, ids: List[int] | None, is_done: bool | None
+    ) -> List[ToDoRow]:
+        # 같은 id가 여러 번 있어도 한 번만 (SQL 저장소의 IN (...) 과 같은 결과)
+        candidates = dict.fromkeys(ids) if ids is not None else self.store.todo_ids_by_user.get(user_id, [])
+        rows: List[ToDoRow] = []
+        for todo_id in candidates:
+            row: ToDoRow | None = self.store.todos.get(todo_id)
+            if row and row.user_id == user_id and (is_done is None or row.is_done == is_done):
+                rows.append(row)
+        return rows
+
+    def _add_completions(self, user_id: int | None, delta: int, day: date) -> None:
+        if user_id is None:
+            return
+        key: Tuple[int, date] = (user_id, day)
+        # SQL 저장소와 같이 0 보다 작아지지 않음
+        self.store.daily_completions[key] = max(self.store.daily_completions.get(key, 0) + delta, 0)
+
+    @staticmethod
+    def _to_orm(row: ToDoRow) -> ToDo:
+        return ToDo(
+            id=row.id,
+            contents=row.contents,
+            is_done=row.is_done,
+            user_id=row.user_id,
+            completed_on=row.completed_on,
+        )
+
+
+class MemoryUserRepository:
+    def __init__(self):
+        self.store = store
+
+    def read_from_primary(self) -> None:
+        pass
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        user_id: int | None = self.store.user_ids_by_username.get(username)
+        if user_id is None:
+            return None
+        username, password = self.store.users[user_id]
+        return User(id=user_id, username=username, password=password)
+
+    async def save_user(self, user: User) -> User:
+        if user.id is None:
+            # username unique index 와 같은 제약
+            if user.username in self.store.user_ids_by_username:
+                raise DuplicateUsernameError(f"duplicate username: {user.username}")
+            self.store.last_user_id += 1
+            user.id = self.store.last_user_id
+        self.store.users[user.id] = (user.username, user.password)
+        self.store.user_ids_by_username[user.username] = user.id
+        return user
@@ -3,9 +3,9 @@
 # 하나의 테이블 = 하나의 클래스
 # 하나의 행(레코드) = 하나의 객체
 
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Date, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
-from src.schema.request import CreateToDoRequest
+from schema.request import CreateToDoRequest
 
 
 Base = declarative_base()
@@ -20,6 +20,19 @@ class ToDo(Base):
     contents = Column(String(256), nullable=False)
     is_done = Column(Boolean, nullable=False)
     user_id = Column(Integer, ForeignKey("user.id"))
+    # 마지막으로 완료한 날짜(UTC) -> 완료 취소되면 오늘이 아니라 이 날의 완료 수에서 뺌
+    # (완료 취소 후에도 지우지 않음, is_done 일 때만 의미가 있음 / 이 컬럼이 생기기 전에 완료된 todo는 NULL)
+    completed_on = Column(Date)
+
+    # 자주 실행되는 쿼리에 필요한 index (database/schema.py 에서 생성/검사)
+    __table_args__ = (
+        Index("ix_todo_user_id_id", "user_id", "id"),  # user의 todo 목록 (WHERE user_id ORDER BY id)
+        Index("ix_todo_user_id_is_done_id", "user_id", "is_done", "id"),  # is_done 조건 (bulk, 통계)
+        # 검색 (MATCH ... AGAINST) -> MySQL에서만 생성
+        Index(
+            "ft_todo_contents", "contents", mysql_prefix="FULLTEXT", info={"dialects": ["mysql"]}
+        ).ddl_if(dialect="mysql"),
+    )
 
     def __repr__(self):
         return f"ToDo(id={self.id}, contents={self.contents}, is_done={self.is_done})"
@@ -43,13 +56,37 @@ class ToDo(Base):
         return self
 
 
+# 일별 완료 수 (rollup) -> 통계 조회 시 todo 전체를 세지 않음
+# todo가 완료(done, 완료 상태로 생성/import 포함)되면 오늘 +1, 완료 취소(undone)되면 완료한 날(todo.completed_on) -1
+# 수정 시점에 바로 반영
+class ToDoDailyCompletion(Base):
+    __tablename__ = "todo_daily_completion"
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    completed = Column(Integer, nullable=False, default=0)
+
+
+# 이미 있는 username으로 저장 (username unique index) -> 저장소 종류와 관계없이 같은 에러
+class DuplicateUsernameError(ValueError):
+    pass
+
+
 class User(Base):
     __tablename__ = "user"
 
     id = Column(Integer, primary_key= True, index=True)
     username = Column(String(256), nullable=False)
     password = Column(String(256), nullable=False)
-    todos = relationship("ToDo", lazy="joined")  # user가 join될 때 todo가 자동으로 조회됨
+    # lazy="joined" 이면 user를 조회할 때마다(로그인, 인증) todo 전체가 LEFT JOIN 됨
+    # -> 기본은 로딩하지 않고(raise), 필요한 쿼리에서만 selectinload 등으로 명시적으로 로딩
+    # todo 목록 조회는 ToDoRepository.get_todos_by_user_id 사용
+    todos = relationship("ToDo", lazy="raise")
+
+    # 인증할 때마다 username으로 조회 -> unique index
+    __table_args__ = (
+        Index("ix_user_username", "username", unique=True),
+    )
 
     @classmethod
     def create(cls, username: str, hashed_password: str) -> "User":
@@ -0,0 +1,98 @@
+# 요청 하나가 실행하는 SQL 개수 세기 (N+1 쿼리 찾기)
+# engine의 before_cursor_execute 이벤트에서 현재 요청의 counter를 1 증가시킴
+# -> repository를 mocking 하지 않는 테스트에서 "GET /todos 는 todo 개수와 관계없이 쿼리 2번 이하" 같은 budget을 검사
+#
+# 요청 단위 budget 은 handler에 @query_budget(n) 으로 지정 (없으면 DB_QUERY_BUDGET)
+# 입력 크기에 비례해서 batch INSERT 를 여러 번 하는 handler(import, bulk 생성)는 @query_budget(None) -> 검사하지 않음
+# 넘으면 DB_QUERY_BUDGET_MODE 에 따라 off | warn(로그만) | strict(에러, 요청은 rollback)
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceededError(RuntimeError):
+    pass
+
+
+# statements : statement -> 실행 횟수 (같은 statement가 반복되면 N+1 가능성이 높음)
+# 요청이 길어져도 메모리 / 로그가 커지지 않도록 서로 다른 statement는 max_statements 개까지만 기록 (count는 모두 셈)
+class QueryCounter:
+    max_statements: int = 20
+
+    def __init__(self):
+        self.count: int = 0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        if statement in self.statements or len(self.statements) < self.max_statements:
+            self.statements[statement] = self.statements.get(statement, 0) + 1
+
+
+# 현재 요청의 counter (asyncio task / SQLAlchemy greenlet 으로 context가 이어짐)
+_current_counter: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+
+# 요청이 끝날 때마다 (route 이름, counter) 를 받는 함수 (테스트 fixture에서 등록)
+_observers: List[Callable[[str, QueryCounter], None]] = []
+
+
+# 모든 engine (primary, replica, 테스트용 sqlite) 에 적용
+# counter가 없으면(요청 밖, app 시작 시 schema 검사 등) 아무것도 하지 않음
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter: QueryCounter | None = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+# handler 별 최대 쿼리 수
+# @router.get("")
+# @query_budget(2)
+# async def get_todos_handler(...)
+def query_budget(limit: int | None) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        func.query_budget = limit
+        return func
+
+    return decorator
+
+
+def get_query_budget(endpoint: Callable, default: int) -> int | None:
+    return getattr(endpoint, "query_budget", default)
+
+
+@contextmanager
+def observe_query_counts(observer: Callable[[str, QueryCounter], None]) -> Iterator[None]:
+    _observers.append(observer)
+    try:
+        yield
+    finally:
+        _observers.remove(observer)
+
+
+def check_query_budget(name: str, counter: QueryCounter, budget: int | None, mode: str) -> None:
+    for observer in _observers:
+        observer(name, counter)
+    if mode == "off" or budget is None or counter.count <= budget:
+        return
+    message: str = f"{name} executed {counter.count} queries (budget {budget})"
+    if mode == "strict":
+        raise QueryBudgetExceededError(message)
+    # 같은 statement가 반복되면 N+1 가능성이 높음 -> 어떤 쿼리였는지 같이 남김
+    logger.warning("%s: %s", message, counter.statements)
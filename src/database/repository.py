@@ -1,60 +1,433 @@
-from sqlalchemy import select, delete
-from sqlalchemy.orm import Session
-from database.orm import ToDo, User
+from collections import Counter, namedtuple
+from datetime import date, datetime, timezone
+
+from sqlalchemy import and_, bindparam, case, or_, select, delete, func, insert, inspect, text, update, Row
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import database_settings
+from database.orm import DuplicateUsernameError, ToDo, ToDoDailyCompletion, User
 from database.connection import get_db
 from fastapi import Depends
-from typing import List
+from typing import AsyncIterator, Dict, List
+
+# 자주 실행되는 조회 쿼리는 statement를 한 번만 만들어 두고 값은 bindparam으로 넘김
+# -> 요청마다 select(...).where(...) 생성 + SQLAlchemy cache key 계산을 하지 않음 (cache key는 statement에 memoize 됨)
+# DB_PREBUILT_STATEMENTS=false 이면 매번 새로 만듬 (비교용, benchmarks/statements.py)
+def _build_get_todo_by_todo_id():
+    return select(ToDo).where(ToDo.id == bindparam("todo_id"))
+
+
+def _build_get_user_by_username():
+    return select(User).where(User.username == bindparam("username"))
+
+
+def _build_get_todos_by_user_id(order: str, with_after_id: bool):
+    stmt = select(ToDo.id, ToDo.contents, ToDo.is_done).where(ToDo.user_id == bindparam("user_id"))
+    if order == "DESC":
+        if with_after_id:
+            stmt = stmt.where(ToDo.id < bindparam("after_id"))
+        stmt = stmt.order_by(ToDo.id.desc())
+    else:
+        if with_after_id:
+            stmt = stmt.where(ToDo.id > bindparam("after_id"))
+        stmt = stmt.order_by(ToDo.id.asc())
+    return stmt.limit(bindparam("limit"))
+
+
+GET_TODO_BY_TODO_ID = _build_get_todo_by_todo_id()
+GET_USER_BY_USERNAME = _build_get_user_by_username()
+GET_TODOS_BY_USER_ID = {
+    (order, with_after_id): _build_get_todos_by_user_id(order, with_after_id)
+    for order in ("ASC", "DESC")
+    for with_after_id in (False, True)
+}
+
+
+def _statement(prebuilt, build, *args):
+    return prebuilt if database_settings.prebuilt_statements else build(*args)
+
+
+# 소유자를 조회하지 않고 삭제한 경우의 결과 (user_id = None)
+DeletedToDo = namedtuple("DeletedToDo", ["id", "user_id"])
+
+
+# MySQL multi-row INSERT 로 생긴 id를 계산할 수 있는지 (서버 URL 별로 한 번만 조회)
+# innodb_autoinc_lock_mode 0, 1 : 한 문장의 id가 연속으로 할당됨 / 2 (interleaved, MySQL 8 기본값) : 보장 안됨
+# auto_increment_increment : id 간격 (multi-primary, group replication 에서는 1보다 큼)
+# -> 계산할 수 있으면 id 간격, 없으면 None
+_autoinc_steps: Dict[str, int | None] = {}
+
+
+# 일별 완료 수의 날짜 기준 (UTC)
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
 
 # repository 의 모든 def를 묶어서 class로 만듬 (래포지토리 패턴 실습) -> main 가서도 바꿔야함
+# AsyncSession 사용 -> 모든 DB 통신은 await
+# commit 하지 않음 -> 요청 단위로 get_db(Unit of Work)에서 한 번만 commit
 class ToDoRepository:
-    def __init__(self, session: Session = Depends(get_db)):
+    def __init__(self, session: AsyncSession = Depends(get_db)):
         self.session = session
 
+    # 이 요청의 이후 조회는 replica가 아니라 primary에서
+    # cache에 저장할 값을 읽을 때 사용 -> replication lag 때문에 쓰기 이전의 값이 cache에 남지 않도록
+    def read_from_primary(self) -> None:
+        self.session.info["primary"] = True
+
     # GET 전체 조회 API (DB통해서)
-    def get_todos(self) -> List[ToDo]:
-        return list(self.session.scalars(select(ToDo)))
+    async def get_todos(self) -> List[ToDo]:
+        return list(await self.session.scalars(select(ToDo)))
+
+
+    # user의 todo 목록을 keyset 방식으로 조회
+    # 정렬(ORDER BY id)과 개수 제한(LIMIT)을 파이썬이 아니라 SQL에서 처리함
+    # 응답에 필요한 컬럼(id, contents, is_done)만 조회 -> ORM 객체를 만들지 않음
+    async def get_todos_by_user_id(
+        self,
+        user_id: int,
+        order: str = "ASC",
+        limit: int = 100,
+        after_id: int | None = None,
+    ) -> List[Row]:
+        order = "DESC" if order == "DESC" else "ASC"
+        key = (order, after_id is not None)
+        stmt = _statement(GET_TODOS_BY_USER_ID[key], _build_get_todos_by_user_id, *key)
+        params: dict = {"user_id": user_id, "limit": limit}
+        if after_id is not None:
+            params["after_id"] = after_id
+        return list(await self.session.execute(stmt, params))
+
+
+    # export 용 : server-side cursor(stream_results)로 batch_size 개씩 읽어서 넘겨줌
+    # 전체 결과를 메모리에 올리지 않고, ORM 객체도 만들지 않음
+    async def stream_todos_by_user_id(
+        self, user_id: int, batch_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        result = await self.session.stream(
+            select(ToDo.id, ToDo.contents, ToDo.is_done)
+            .where(ToDo.user_id == user_id)
+            .order_by(ToDo.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            yield rows
 
 
     # 단일 todo 조회 API (DB통해서)
-    def get_todo_by_todo_id(self, todo_id: int) -> ToDo | None:
-        return self.session.scalar(select(ToDo).where(ToDo.id == todo_id)) 
+    async def get_todo_by_todo_id(self, todo_id: int) -> ToDo | None:
+        stmt = _statement(GET_TODO_BY_TODO_ID, _build_get_todo_by_todo_id)
+        return await self.session.scalar(stmt, {"todo_id": todo_id})
 
     # DB에 데이터 넣기 (create todo)
     # ToDo는 orm 객체
-    def create_todo(self, todo: ToDo) -> ToDo:
+    async def create_todo(self, todo: ToDo) -> ToDo:
+        if todo.is_done:
+            todo.completed_on = _today()
         self.session.add(instance=todo) # session 객체에 orm객체 쌓임
-        self.session.commit() # DB에 save됨, id 값이 할당됨
-        self.session.refresh(instance=todo) # DB에서 다시 한번 데이터를 읽어옴 -> todo id 값이 반영되어 있음
+        await self.session.flush() # INSERT 실행, lastrowid로 id 값이 할당됨 (commit은 요청이 끝날 때 한 번)
+        # refresh(SELECT) 하지 않음 -> flush 후에도 값이 그대로 남아있음
+        if todo.is_done:
+            await self._add_completions(user_id=todo.user_id, delta=1)
         return todo
 
 
+    # 여러 todo를 한 transaction 안에서 multi-row INSERT로 넣음
+    # INSERT INTO todo (...) VALUES (...), (...), ... 를 batch_size 개씩 실행 (commit은 요청이 끝날 때 한 번)
+    async def create_todos(self, todos: List[ToDo], batch_size: int = 500) -> List[ToDo]:
+        dialect = self.session.get_bind().dialect
+        returning: bool = dialect.insert_executemany_returning_sort_by_parameter_order
+        step: int | None = None if returning else await self._get_autoinc_step()
+        for todo in todos:
+            if todo.is_done:
+                todo.completed_on = _today()
+        for start in range(0, len(todos), batch_size):
+            batch: List[ToDo] = todos[start:start + batch_size]
+            values: List[dict] = [
+                {
+                    "contents": todo.contents,
+                    "is_done": todo.is_done,
+                    "user_id": todo.user_id,
+                    "completed_on": todo.completed_on,
+                }
+                for todo in batch
+            ]
+            if returning:
+                # RETURNING 지원 (SQLite, MariaDB 등) -> 생성된 id를 입력 순서대로 받음
+                ids = await self.session.scalars(
+                    insert(ToDo).returning(ToDo.id, sort_by_parameter_order=True), values
+                )
+            elif step is not None:
+                # MySQL은 RETURNING이 없음 -> multi-row INSERT의 lastrowid는 첫 번째 row의 id
+                result = await self.session.execute(insert(ToDo).values(values))
+                ids = range(result.lastrowid, result.lastrowid + len(batch) * step, step)
+            else:
+                # id가 연속이라는 보장이 없음 -> ORM flush (row 마다 INSERT 후 lastrowid)
+                self.session.add_all(batch)
+                await self.session.flush()
+                continue
+            for todo, todo_id in zip(batch, ids):
+                todo.id = todo_id
+        await self._add_created_completions([todo.user_id for todo in todos if todo.is_done])
+        return todos
+
+    async def _get_autoinc_step(self) -> int | None:
+        # INSERT 를 실행할 primary의 설정을 조회 (clause로 INSERT 를 넘겨서 replica로 가지 않도록)
+        primary = self.session.get_bind(clause=insert(ToDo))
+        url: str = str(primary.url)
+        if url not in _autoinc_steps:
+            lock_mode, increment = (await self.session.execute(
+                text("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment"),
+                bind_arguments={"clause": insert(ToDo)},
+            )).one()
+            _autoinc_steps[url] = int(increment) if int(lock_mode) in (0, 1) else None
+        return _autoinc_steps[url]
+
+
+    # import 용 : ORM 객체 없이 dict(contents, is_done, user_id) 목록을 multi-row INSERT 한 번으로 넣음
+    async def insert_todo_rows(self, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        today: date = _today()
+        rows = [{**row, "completed_on": today if row["is_done"] else None} for row in rows]
+        await self.session.execute(insert(ToDo).values(rows))
+        await self._add_created_completions([row["user_id"] for row in rows if row["is_done"]])
+        return len(rows)
+
+    # 완료 상태로 생성된 todo의 user_id 목록 -> user 별로 오늘 완료 수에 더함 (user 별 upsert 한 번)
+    async def _add_created_completions(self, user_ids: List[int | None]) -> None:
+        for user_id, count in Counter(user_ids).items():
+            await self._add_completions(user_id=user_id, delta=count)
+
+
     # todo의 is_done에 변경될 경우, DB에서 수정 반영해줌
     # create_todo과 코드가 같지만 따로 관리해주는게 좋아서 따로 하나 만듬
-    def update_todo(self, todo: ToDo) -> ToDo:
+    async def update_todo(self, todo: ToDo) -> ToDo:
+        # done() / undone() 으로 is_done이 바뀌었으면 일별 완료 수에도 반영
+        history = inspect(todo).attrs.is_done.history
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            if todo.is_done:
+                todo.completed_on = _today()
+                await self._add_completions(user_id=todo.user_id, delta=1)
+            elif todo.completed_on is not None:
+                await self._add_completions(user_id=todo.user_id, delta=-1, day=todo.completed_on)
         self.session.add(instance=todo) # session 객체에 orm객체 쌓임
-        self.session.commit() # DB에 save됨, id 값이 할당됨
-        self.session.refresh(instance=todo) # DB에서 다시 한번 데이터를 읽어옴 -> todo id 값이 반영되어 있음
+        await self.session.flush() # UPDATE 실행
         return todo
 
-    def delete_todo(self, todo_id: int) -> None:
-        self.session.execute(delete(ToDo).where(ToDo.id == todo_id))
-        self.session.commit()
+    # SELECT 없이 UPDATE ... WHERE id = :id 로 바로 수정, 수정된 row가 없으면 None (-> 404)
+    # is_done이 실제로 바뀐 경우에만 UPDATE 되도록 조건을 걸어서, 바뀐 경우 일별 완료 수에 반영
+    # 완료 취소는 completed_on 을 그대로 두므로 RETURNING / 응답용 조회로 완료한 날을 알 수 있음
+    async def update_todo_is_done(self, todo_id: int, is_done: bool) -> Row | None:
+        stmt = (
+            update(ToDo)
+            .where(ToDo.id == todo_id, ToDo.is_done != is_done)
+            .values(is_done=is_done, **({"completed_on": _today()} if is_done else {}))
+        )
+        columns = (ToDo.id, ToDo.contents, ToDo.is_done, ToDo.user_id, ToDo.completed_on)
+        todo: Row | None = None
+        if self.session.get_bind().dialect.update_returning:
+            # RETURNING 지원 -> UPDATE 한 번으로 수정된 row까지 받음
+            todo = (await self.session.execute(stmt.returning(*columns))).first()
+            changed: bool = todo is not None
+        else:
+            # MySQL -> rowcount로 수정 여부 확인
+            changed: bool = (await self.session.execute(stmt)).rowcount > 0
+        if todo is None:
+            # 응답용 조회 (이미 같은 값이었거나 RETURNING이 없는 경우, 없는 todo면 None)
+            todo = (await self.session.execute(
+                select(*columns).where(ToDo.id == todo_id)
+            )).first()
+        if changed and is_done:
+            await self._add_completions(user_id=todo.user_id, delta=1)
+        elif changed and todo.completed_on is not None:
+            await self._add_completions(user_id=todo.user_id, delta=-1, day=todo.completed_on)
+        return todo
+
+    # 삭제된 todo의 (id, user_id) 반환 (없는 todo면 None) -> user_id로 목록 cache 무효화
+    # with_owner=False : 소유자가 필요 없음 (cache 사용 안함) -> user_id 는 None
+    async def delete_todo(self, todo_id: int, with_owner: bool = True) -> Row | DeletedToDo | None:
+        stmt = delete(ToDo).where(ToDo.id == todo_id)
+        columns = (ToDo.id, ToDo.user_id)
+        if self.session.get_bind().dialect.delete_returning:
+            # RETURNING 지원 -> 삭제 전에 SELECT 하지 않음
+            return (await self.session.execute(stmt.returning(*columns))).first()
+        if not with_owner:
+            # MySQL -> DELETE 한 번, rowcount로 삭제 여부 확인
+            deleted: bool = (await self.session.execute(stmt)).rowcount > 0
+            return DeletedToDo(todo_id, None) if deleted else None
+        # MySQL + cache 무효화에 소유자가 필요 -> 삭제할 row를 잠그고 소유자 조회 후 삭제 (round-trip 2번)
+        # (DELETE 는 삭제한 row의 값을 돌려주지 않음, handler는 인증이 없어서 소유자를 따로 알 수 없음)
+        todo: Row | None = (await self.session.execute(
+            select(*columns).where(ToDo.id == todo_id).with_for_update()
+        )).first()
+        if todo:
+            await self.session.execute(stmt)
+        return todo
+
+    # 여러 todo를 한 문장으로 수정/삭제 (UPDATE/DELETE ... WHERE user_id = ? AND id IN (...))
+    # 조회(SELECT) 없이 바로 실행하고, 영향받은 row 수를 반환
+    @staticmethod
+    def _filter_conditions(user_id: int, ids: List[int] | None, is_done: bool | None) -> list:
+        conditions: list = [ToDo.user_id == user_id]
+        if ids is not None:
+            conditions.append(ToDo.id.in_(ids))
+        if is_done is not None:
+            conditions.append(ToDo.is_done == is_done)
+        return conditions
+
+    @classmethod
+    def _filter_todos(cls, stmt, user_id: int, ids: List[int] | None, is_done: bool | None):
+        stmt = stmt.where(*cls._filter_conditions(user_id=user_id, ids=ids, is_done=is_done))
+        return stmt.execution_options(synchronize_session=False)
+
+    async def update_todos(
+        self,
+        user_id: int,
+        set_is_done: bool,
+        ids: List[int] | None = None,
+        is_done: bool | None = None,
+    ) -> int:
+        if not set_is_done and is_done is not False:
+            # 완료 취소 -> todo를 수정하기 전에 완료한 날 별로 완료 수에서 뺌
+            await self._remove_completions(user_id=user_id, ids=ids)
+        stmt = self._filter_todos(update(ToDo), user_id=user_id, ids=ids, is_done=is_done)
+        # 이미 같은 값인 row는 제외 -> rowcount = 실제로 바뀐 row 수
+        stmt = stmt.where(ToDo.is_done != set_is_done).values(
+            is_done=set_is_done, **({"completed_on": _today()} if set_is_done else {})
+        )
+        updated: int = (await self.session.execute(stmt)).rowcount
+        if updated and set_is_done:
+            await self._add_completions(user_id=user_id, delta=updated)
+        return updated
+
+    # 완료 취소될 todo(완료 상태, 완료한 날이 있음)를 완료한 날 별로 세어서 그 날의 완료 수에서 뺌 -> UPDATE 한 문장
+    # UPDATE todo_daily_completion SET completed = GREATEST(completed - (SELECT COUNT(*) FROM todo WHERE ... AND completed_on = day), 0)
+    # WHERE user_id = ? AND day IN (SELECT completed_on FROM todo WHERE ...)
+    async def _remove_completions(self, user_id: int, ids: List[int] | None) -> None:
+        conditions: list = [
+            *self._filter_conditions(user_id=user_id, ids=ids, is_done=True),
+            ToDo.completed_on.is_not(None),
+        ]
+        undone = (
+            select(func.count())
+            .where(*conditions, ToDo.completed_on == ToDoDailyCompletion.day)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(ToDoDailyCompletion)
+            .where(
+                ToDoDailyCompletion.user_id == user_id,
+                ToDoDailyCompletion.day.in_(select(ToDo.completed_on).where(*conditions)),
+            )
+            .values(completed=self._greatest(ToDoDailyCompletion.completed - undone, 0))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    async def delete_todos(
+        self, user_id: int, ids: List[int] | None = None, is_done: bool | None = None
+    ) -> int:
+        stmt = self._filter_todos(delete(ToDo), user_id=user_id, ids=ids, is_done=is_done)
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+
+
+    # contents 검색 -> 관련도(score) 높은 순, 같은 score는 id 큰 순
+    # MySQL : FULLTEXT index (MATCH ... AGAINST), 그 외(SQLite 등 개발용) : 단어별 LIKE 개수를 score로 사용
+    async def search_todos(
+        self,
+        user_id: int,
+        query: str,
+        limit: int = 100,
+        after: tuple[float, int] | None = None,
+    ) -> List[Row]:
+        if self.session.get_bind().dialect.name == "mysql":
+            score = mysql.match(ToDo.contents, against=query).in_natural_language_mode()
+            matched = score  # WHERE MATCH(...) AGAINST(...) 형태여야 FULLTEXT index를 사용
+        else:
+            terms: List[str] = query.split() or [query]
+            score = sum(
+                case((ToDo.contents.contains(term, autoescape=True), 1), else_=0)
+                for term in terms
+            )
+            matched = score > 0
+        stmt = select(ToDo.id, ToDo.contents, ToDo.is_done, score.label("score")).where(
+            ToDo.user_id == user_id, matched
+        )
+        if after is not None:
+            after_score, after_id = after
+            stmt = stmt.where(
+                or_(score < after_score, and_(score == after_score, ToDo.id < after_id))
+            )
+        stmt = stmt.order_by(score.desc(), ToDo.id.desc()).limit(limit)
+        return list(await self.session.execute(stmt))
+
+    # 통계 : SELECT is_done, COUNT(*) ... GROUP BY is_done  ((user_id, is_done) index 사용)
+    async def get_todo_stats(self, user_id: int) -> Dict[bool, int]:
+        result = await self.session.execute(
+            select(ToDo.is_done, func.count())
+            .where(ToDo.user_id == user_id)
+            .group_by(ToDo.is_done)
+        )
+        return {bool(is_done): count for is_done, count in result}
+
+    async def get_daily_completions(self, user_id: int, since: date) -> List[ToDoDailyCompletion]:
+        return list(await self.session.scalars(
+            select(ToDoDailyCompletion)
+            .where(ToDoDailyCompletion.user_id == user_id, ToDoDailyCompletion.day >= since)
+            .order_by(ToDoDailyCompletion.day)
+        ))
+
+    # day(기본은 오늘, UTC)의 완료 수에 delta 만큼 더함 (row가 없으면 생성) -> upsert 한 문장
+    # 완료한 날짜가 없던 이전 데이터와 섞여도 0 보다 작아지지 않도록 함
+    async def _add_completions(self, user_id: int | None, delta: int, day: date | None = None) -> None:
+        if user_id is None:
+            return
+        values: dict = {
+            "user_id": user_id,
+            "day": day or _today(),
+            "completed": max(delta, 0),
+        }
+        completed = self._greatest(ToDoDailyCompletion.completed + delta, 0)
+        if self.session.get_bind().dialect.name == "mysql":
+            stmt = mysql.insert(ToDoDailyCompletion).values(values)
+            stmt = stmt.on_duplicate_key_update(completed=completed)
+        else:
+            stmt = sqlite.insert(ToDoDailyCompletion).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "day"], set_={"completed": completed}
+            )
+        await self.session.execute(stmt)
+
+    def _greatest(self, *values):
+        if self.session.get_bind().dialect.name == "mysql":
+            return func.greatest(*values)
+        return func.max(*values)  # SQLite 의 max(a, b)는 scalar 함수
 
 
 
 class UserRepository:
-    def __init__(self, session: Session = Depends(get_db)):
+    def __init__(self, session: AsyncSession = Depends(get_db)):
         self.session = session
 
-    def get_user_by_username(self, username: str) -> User | None:
+    def read_from_primary(self) -> None:
+        self.session.info["primary"] = True
+
+    # 인증/로그인에서 사용 -> todos는 로딩하지 않음 (User.todos lazy="raise")
+    async def get_user_by_username(self, username: str) -> User | None:
+        stmt = _statement(GET_USER_BY_USERNAME, _build_get_user_by_username)
+        return await self.session.scalar(stmt, {"username": username})
 
-        return self.session.scalar(
-            select(User).where(User.username == username)
-        )
-                  
 
-    def save_user(self, user: User) -> User:
+    async def save_user(self, user: User) -> User:
         self.session.add(instance=user) # session 객체에 orm객체 쌓임
-        self.session.commit() # DB save
-        self.session.refresh(instance=user) # DB에서 다시 한번 데이터를 읽어옴
-        return user
\ No newline at end of file
+        try:
+            await self.session.flush() # INSERT 실행 (commit은 요청이 끝날 때 한 번)
+        except IntegrityError as e:
+            # username unique index 위반 (transaction은 요청이 끝날 때 rollback)
+            raise DuplicateUsernameError(f"duplicate username: {user.username}") from e
+        await self.session.refresh(instance=user) # DB에서 다시 한번 데이터를 읽어옴
+        return user
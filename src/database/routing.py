@@ -0,0 +1,125 @@
+# Read replica routing
+# 조회(SELECT)는 replica로, 쓰기(INSERT/UPDATE/DELETE, flush)는 primary로 보냄
+# replica는 primary보다 조금 늦게 반영될 수 있으므로(replication lag),
+# 방금 쓴 요청/사용자는 일정 시간(window) 동안 primary에서 읽도록 함 (read-your-writes)
+#
+# uvicorn worker가 여러 개면 쓰기 다음 요청이 다른 worker로 갈 수 있음
+# -> 이 worker의 기록(dict) + Redis key(rw:{client}, window 동안 유지)로 worker 사이에서도 공유
+import hashlib
+import itertools
+import logging
+import time
+from typing import Dict, List
+
+import redis
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class ReadYourWrites:
+    max_keys: int = 10000
+
+    def __init__(self, window: float, shared: bool = False):
+        self.window = window
+        self.shared = shared  # Redis로 worker 사이 공유
+        self._last_write: Dict[str, float] = {}
+
+    def mark(self, key: str | None) -> None:
+        if key is None or self.window <= 0:
+            return
+        now = time.monotonic()
+        if len(self._last_write) >= self.max_keys:
+            # window가 지난 key는 정리
+            self._last_write = {
+                k: t for k, t in self._last_write.items() if now - t < self.window
+            }
+        self._last_write[key] = now
+
+    def is_recent(self, key: str | None) -> bool:
+        if key is None:
+            return False
+        last_write: float | None = self._last_write.get(key)
+        return last_write is not None and time.monotonic() - last_write < self.window
+
+    # key(access token 등)를 그대로 Redis key로 쓰지 않음
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return "rw:" + hashlib.blake2s(key.encode("UTF-8"), digest_size=16).hexdigest()
+
+    # commit 후 : 다른 worker에도 window 동안 primary에서 읽도록 알림
+    async def mark_shared(self, key: str | None) -> None:
+        if key is None or self.window <= 0 or not self.shared:
+            return
+        try:
+            await redis_client.set(self._redis_key(key), 1, px=int(self.window * 1000))
+        except redis.RedisError:
+            logger.warning("read-your-writes mark failed", exc_info=True)
+
+    # 요청 시작 시 : 다른 worker에서 최근에 쓰기를 한 client인지 확인
+    # Redis에 문제가 있으면 이 worker의 기록만 사용
+    async def is_recent_shared(self, key: str | None) -> bool:
+        if key is None or self.window <= 0 or not self.shared:
+            return False
+        try:
+            return bool(await redis_client.exists(self._redis_key(key)))
+        except redis.RedisError:
+            logger.warning("read-your-writes check failed", exc_info=True)
+            return False
+
+
+# info["primary"] : 이 session의 조회는 모두 primary에서 (다른 worker에서 최근에 쓰기를 한 client 등)
+class RoutingSession(Session):
+    primary: Engine
+    replicas: List[Engine] = []
+    read_your_writes: ReadYourWrites = ReadYourWrites(window=0)
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            not self.replicas
+            or self._flushing
+            or self.info.get("wrote")
+            or self.info.get("primary")
+            or isinstance(clause, (Insert, Update, Delete))
+            or self.read_your_writes.is_recent(self.info.get("rw_key"))
+        ):
+            return self.primary
+        return next(self._replica_cycle)
+
+
+# 한 번이라도 쓰기를 한 session은 이후 조회도 primary에서 (commit 후 refresh 등)
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_commit(session):
+    if session.info.get("wrote"):
+        session.read_your_writes.mark(session.info.get("rw_key"))
+
+
+def make_routing_session_class(
+    primary: Engine, replicas: List[Engine], window: float, shared: bool = False
+) -> type:
+    return type(
+        "BoundRoutingSession",
+        (RoutingSession,),
+        {
+            "primary": primary,
+            "replicas": replicas,
+            "_replica_cycle": itertools.cycle(replicas),
+            # replica가 없으면 모두 primary에서 읽으므로 공유할 필요 없음
+            "read_your_writes": ReadYourWrites(window=window, shared=shared and bool(replicas)),
+        },
+    )
@@ -0,0 +1,173 @@
+# 테이블 / index 관리 (database/orm.py 의 정의를 기준으로 생성, 검사)
+# create_table.txt 처럼 DDL을 손으로 작성하지 않음
+#
+# python -m database.schema create   -> 없는 테이블, 컬럼(NULL 허용 컬럼만), index 생성
+# python -m database.schema verify   -> 빠진 컬럼, index가 있으면 출력 후 exit code 1
+import argparse
+import asyncio
+import logging
+import sys
+from typing import List
+
+from sqlalchemy import Column, Index, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateColumn
+
+from database.orm import Base
+
+logger = logging.getLogger(__name__)
+
+
+class MissingIndexError(RuntimeError):
+    pass
+
+
+def _is_covered(index: Index, existing: List[dict], primary_key: List[str]) -> bool:
+    columns: List[str] = [column.name for column in index.columns]
+    # 같은 컬럼으로 시작하는 index가 이미 있으면 OK (unique가 필요하면 unique index만 인정)
+    for existing_index in existing:
+        existing_columns: List[str] = existing_index["column_names"]
+        if existing_columns[:len(columns)] == columns and (
+            existing_index["unique"] or not index.unique
+        ):
+            return True
+    return primary_key[:len(columns)] == columns
+
+
+# 특정 DB에서만 쓰는 index (ex. MySQL FULLTEXT) 는 info={"dialects": [...]} 로 표시
+def _required_indexes(table, dialect_name: str) -> List[Index]:
+    return [
+        index for index in table.indexes
+        if dialect_name in index.info.get("dialects", [dialect_name])
+    ]
+
+
+def _find_missing_indexes(sync_conn) -> List[Index]:
+    inspector = inspect(sync_conn)
+    missing: List[Index] = []
+    for table in Base.metadata.sorted_tables:
+        indexes: List[Index] = _required_indexes(table, sync_conn.dialect.name)
+        if not inspector.has_table(table.name):
+            missing.extend(indexes)
+            continue
+        existing: List[dict] = inspector.get_indexes(table.name)
+        # unique constraint도 index로 취급
+        existing += [
+            {"column_names": constraint["column_names"], "unique": True}
+            for constraint in inspector.get_unique_constraints(table.name)
+        ]
+        primary_key: List[str] = inspector.get_pk_constraint(table.name)["constrained_columns"]
+        missing.extend(
+            index for index in indexes if not _is_covered(index, existing, primary_key)
+        )
+    return missing
+
+
+# 이미 있던 테이블에 나중에 추가된 컬럼 (ex. todo.completed_on)
+def _find_missing_columns(sync_conn) -> List[Column]:
+    inspector = inspect(sync_conn)
+    missing: List[Column] = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing: set = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(column for column in table.columns if column.name not in existing)
+    return missing
+
+
+def _create_schema(sync_conn) -> List[Column | Index]:
+    # 없는 테이블 생성 (테이블을 새로 만들면 index도 같이 만들어짐)
+    Base.metadata.create_all(sync_conn)
+    # 이미 있던 테이블에 빠진 컬럼 추가 -> 기존 row에 값을 채울 수 없으므로 NULL 허용 컬럼만
+    columns: List[Column] = _find_missing_columns(sync_conn)
+    for column in columns:
+        if not column.nullable:
+            raise RuntimeError(f"cannot add NOT NULL column {_describe(column)}")
+        table: str = sync_conn.dialect.identifier_preparer.format_table(column.table)
+        definition = CreateColumn(column).compile(dialect=sync_conn.dialect)
+        sync_conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {definition}")
+    # 이미 있던 테이블에 빠진 index 추가
+    missing: List[Index] = _find_missing_indexes(sync_conn)
+    for index in missing:
+        index.create(sync_conn)
+    return [*columns, *missing]
+
+
+def _describe(item: Column | Index) -> str:
+    if isinstance(item, Column):
+        return f"column {item.table.name}.{item.name}"
+    return f"index {item.name}"
+
+
+async def create_schema(engine: AsyncEngine) -> List[Column | Index]:
+    async with engine.begin() as conn:
+        return await conn.run_sync(_create_schema)
+
+
+async def find_missing_indexes(engine: AsyncEngine) -> List[Index]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_find_missing_indexes)
+
+
+async def find_missing_columns(engine: AsyncEngine) -> List[Column]:
+    async with engine.connect() as conn:
+        return await conn.run_sync(_find_missing_columns)
+
+
+# app 시작 시 검사 (DB_SCHEMA_CHECK: off | warn | strict)
+async def check_schema(engine: AsyncEngine, mode: str) -> None:
+    if mode == "off":
+        return
+    try:
+        columns: List[Column] = await find_missing_columns(engine)
+        missing: List[Index] = await find_missing_indexes(engine)
+    except Exception:
+        if mode == "strict":
+            raise
+        logger.warning("schema check skipped: database is not reachable", exc_info=True)
+        return
+    if not columns and not missing:
+        return
+    problems: List[str] = []
+    if columns:
+        problems.append("missing columns: " + ", ".join(
+            f"{column.table.name}.{column.name}" for column in columns
+        ))
+    if missing:
+        problems.append("missing indexes: " + ", ".join(
+            f"{index.table.name}({', '.join(column.name for column in index.columns)})"
+            for index in missing
+        ))
+    message: str = "; ".join(problems) + " -> run `python -m database.schema create`"
+    if mode == "strict":
+        raise MissingIndexError(message)
+    logger.warning(message)
+
+
+def main() -> None:
+    from database.connection import engine
+
+    parser = argparse.ArgumentParser(description="create / verify todo tables and indexes")
+    parser.add_argument("command", choices=["create", "verify"])
+    args = parser.parse_args()
+
+    async def run() -> int:
+        try:
+            if args.command == "create":
+                for item in await create_schema(engine):
+                    print(f"created {_describe(item)}")
+                return 0
+            missing: List[Column | Index] = [
+                *await find_missing_columns(engine), *await find_missing_indexes(engine)
+            ]
+            for item in missing:
+                print(f"missing {_describe(item)}")
+            return 1 if missing else 0
+        finally:
+            await engine.dispose()
+
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# 저장소(backend) 선택
+# handler는 구현체가 아니라 아래 Protocol 에 의존하고, 실제 구현체는 DB_BACKEND 설정으로 정해짐
+#   mysql / sqlite : database/repository.py (SQLAlchemy, AsyncSession)
+#   memory        : database/memory.py (dict + 정렬된 id 목록)
+from datetime import date
+from typing import AsyncIterator, Dict, List, Protocol
+
+from config import database_settings
+from database.memory import MemoryToDoRepository, MemoryUserRepository
+from database.orm import ToDo, ToDoDailyCompletion, User
+from database.repository import ToDoRepository, UserRepository
+
+BACKENDS = ("mysql", "sqlite", "memory")
+
+
+class ToDoStorage(Protocol):
+    def read_from_primary(self) -> None: ...
+
+    async def get_todos(self) -> List[ToDo]: ...
+
+    async def get_todos_by_user_id(
+        self, user_id: int, order: str = "ASC", limit: int = 100, after_id: int | None = None
+    ) -> list: ...
+
+    def stream_todos_by_user_id(self, user_id: int, batch_size: int = 1000) -> AsyncIterator[list]: ...
+
+    async def get_todo_by_todo_id(self, todo_id: int) -> ToDo | None: ...
+
+    async def create_todo(self, todo: ToDo) -> ToDo: ...
+
+    async def create_todos(self, todos: List[ToDo], batch_size: int = 500) -> List[ToDo]: ...
+
+    async def insert_todo_rows(self, rows: List[dict]) -> int: ...
+
+    async def update_todo(self, todo: ToDo) -> ToDo: ...
+
+    async def update_todo_is_done(self, todo_id: int, is_done: bool): ...
+
+    async def delete_todo(self, todo_id: int, with_owner: bool = True): ...
+
+    async def update_todos(
+        self, user_id: int, set_is_done: bool, ids: List[int] | None = None, is_done: bool | None = None
+    ) -> int: ...
+
+    async def delete_todos(
+        self, user_id: int, ids: List[int] | None = None, is_done: bool | None = None
+    ) -> int: ...
+
+    async def search_todos(
+        self, user_id: int, query: str, limit: int = 100, after: tuple[float, int] | None = None
+    ) -> list: ...
+
+    async def get_todo_stats(self, user_id: int) -> Dict[bool, int]: ...
+
+    async def get_daily_completions(self, user_id: int, since: date) -> List[ToDoDailyCompletion]: ...
+
+
+class UserStorage(Protocol):
+    def read_from_primary(self) -> None: ...
+
+    async def get_user_by_username(self, username: str) -> User | None: ...
+
+    async def save_user(self, user: User) -> User: ...
+
+
+if database_settings.backend not in BACKENDS:
+    raise ValueError(f"DB_BACKEND must be one of {BACKENDS}: {database_settings.backend}")
+
+# Depends(get_todo_repository) -> 선택된 class의 __init__ 의존성(session 등)까지 fastapi가 처리
+if database_settings.backend == "memory":
+    get_todo_repository = MemoryToDoRepository
+    get_user_repository = MemoryUserRepository
+else:
+    get_todo_repository = ToDoRepository
+    get_user_repository = UserRepository
@@ -0,0 +1,42 @@
+# ETag / If-None-Match (조건부 조회)
+# 응답 body를 만들어서 hash 하지 않고, 사용자별 todo 세대 번호(cache.py의 generation)로 ETag를 만듦
+# -> If-None-Match 가 같으면 DB 조회, 직렬화 없이 304 Not Modified
+#
+# 목록 : "todos-{user_id}-{세대}-{query parameter hash}"
+# 단건 : "todo-{todo_id}-{user_id}-{세대}"  -> 세대 확인에 필요한 user_id를 ETag에 같이 넣어둠
+# 사용자의 todo가 하나라도 바뀌면 세대가 바뀌므로 이전 ETag는 모두 맞지 않게 됨
+# 세대는 시각 기반 값에서 시작하므로 Redis에서 세대 key가 사라져도 이전 ETag가 다시 만들어지지 않음
+import hashlib
+from typing import List, Tuple
+
+
+def make_list_etag(user_id: int, generation: str, params: str) -> str:
+    digest: str = hashlib.blake2s(params.encode("UTF-8"), digest_size=8).hexdigest()
+    return f'"todos-{user_id}-{generation}-{digest}"'
+
+
+def make_todo_etag(todo_id: int, user_id: int, generation: str) -> str:
+    return f'"todo-{todo_id}-{user_id}-{generation}"'
+
+
+# If-None-Match: "a", W/"b" -> ['"a"', '"b"'] (If-None-Match는 weak 비교)
+def parse_if_none_match(header: str | None) -> List[str]:
+    if not header:
+        return []
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    tags: List[str] = parse_if_none_match(header)
+    return "*" in tags or etag in tags
+
+
+# If-None-Match 에서 해당 todo의 ETag를 찾아 (user_id, 세대) 반환
+def find_todo_etag(header: str | None, todo_id: int) -> Tuple[int, str] | None:
+    for tag in parse_if_none_match(header):
+        parts: List[str] = tag.strip('"').split("-")
+        if len(parts) != 4 or parts[0] != "todo" or parts[1] != str(todo_id):
+            continue
+        if parts[2].isdigit() and parts[3].isdigit():
+            return int(parts[2]), parts[3]
+    return None
@@ -7,13 +7,38 @@
 # pip install pytest
 # pip install httpx
 
-from fastapi import FastAPI
-from api import todo, user
-
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import FastAPI
+from api import internal, todo, user
+from cache import redis_client
+from config import cache_settings, database_settings, redis_settings
+from database.connection import engine
+from database.schema import check_schema
+from tiered_cache import invalidation_subscriber
+
+
+# lifespan : 서버 시작 / 종료 시 실행할 코드
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Redis connection pool / client 생성 (Lua script 도 이 client에 등록)
+    redis_client.open(redis_settings)
+    # hot query에 필요한 index가 없으면 경고 (strict 이면 서버가 시작되지 않음)
+    if database_settings.backend != "memory":
+        await check_schema(engine, mode=database_settings.schema_check)
+    # 다른 worker의 cache 무효화 메시지 구독 (worker 메모리 cache에서 제거)
+    if cache_settings.enabled:
+        invalidation_subscriber.start()
+    yield
+    await invalidation_subscriber.stop()
+    await redis_client.close()
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(todo.router)
 app.include_router(user.router)
+app.include_router(internal.router)
 
 
 @app.get("/")  # root path로 get 요청
@@ -0,0 +1,38 @@
+# Keyset(cursor) pagination
+# offset 방식은 앞의 row를 모두 읽고 버려야 하지만, keyset 방식은 마지막으로 본 id 다음부터 index로 바로 읽음
+# cursor는 클라이언트 입장에서 의미를 알 수 없는(opaque) 문자열로 전달
+import base64
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    raw: bytes = json.dumps({"id": last_id}).encode("UTF-8")
+    return base64.urlsafe_b64encode(raw).decode("UTF-8")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        payload: dict = json.loads(base64.urlsafe_b64decode(cursor.encode("UTF-8")))
+        last_id = payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("invalid cursor")
+    if not isinstance(last_id, int):
+        raise ValueError("invalid cursor")
+    return last_id
+
+
+# 검색 결과는 (score, id) 순서로 정렬되므로 cursor에 score도 같이 넣음
+def encode_search_cursor(score: float, last_id: int) -> str:
+    raw: bytes = json.dumps({"score": score, "id": last_id}).encode("UTF-8")
+    return base64.urlsafe_b64encode(raw).decode("UTF-8")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        payload: dict = json.loads(base64.urlsafe_b64decode(cursor.encode("UTF-8")))
+        score, last_id = payload["score"], payload["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("invalid cursor")
+    if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+        raise ValueError("invalid cursor")
+    return float(score), last_id
@@ -0,0 +1,133 @@
+# 요청 수 제한 (token bucket)
+# 로그인 / 회원가입은 bcrypt 때문에 요청 하나가 CPU를 수십 ms 씀
+# -> 비밀번호 대입 공격 같은 요청이 몰리면 worker가 모두 bcrypt에 묶여서 /todos 요청까지 밀림
+#
+# client IP 별, username 별 bucket을 Redis에 두고 Lua script로 한 번에 확인 / 차감 (worker 사이에서도 정확)
+# 요청 1개당 token 1개, 모자라면 bcrypt, DB 조회 전에 429 Too Many Requests (Retry-After header)
+# Redis에 문제가 있으면 제한하지 않고 통과 (로그인 자체가 막히지 않도록)
+#
+# @router.post("/log-in", dependencies=[Depends(RateLimit("log-in"))])
+import json
+import logging
+import math
+from typing import List, Tuple
+
+import redis
+from fastapi import HTTPException, Request
+
+from cache import redis_client
+from config import rate_limit_settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS : bucket key 들, ARGV : bucket 마다 (최대 token 수, 초당 채워지는 token 수)
+# 모든 bucket에 token이 있을 때만 모두 1개씩 차감 -> 하나라도 모자라면 아무것도 차감하지 않음
+# 시간은 Redis 서버 시각 (worker 마다 시계가 달라도 같은 기준)
+# return {허용 여부, 다시 시도할 수 있을 때까지 남은 ms}
+_TAKE_TOKEN = redis_client.script("""
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2]) / 1000
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    current = math.min(capacity, current + math.max(0, now - ts) * rate)
+    tokens[i] = current
+    if current < 1 then
+        wait = math.max(wait, math.ceil((1 - current) / rate))
+    end
+end
+if wait > 0 then
+    return {0, wait}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2]) / 1000
+    redis.call('HSET', key, 'tokens', tokens[i] - 1, 'ts', now)
+    -- 가득 찰 때까지 쓰지 않으면 삭제 (가득 찬 bucket과 같음)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate))
+end
+return {1, 0}
+""")
+
+
+class RateLimitMetrics:
+    def __init__(self):
+        self.allowed: int = 0
+        self.limited: int = 0
+        self.errors: int = 0
+
+    def to_dict(self) -> dict:
+        return {"allowed": self.allowed, "limited": self.limited, "errors": self.errors}
+
+
+metrics = RateLimitMetrics()
+
+
+# "10/60" -> (최대 token 수 10, 초당 10/60 개)
+def parse_rate(rate: str) -> Tuple[int, float]:
+    limit, _, period = rate.partition("/")
+    capacity, seconds = int(limit), float(period)
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"invalid rate limit: {rate}")
+    return capacity, capacity / seconds
+
+
+# route 별 dependency
+# 설정은 RATE_LIMIT_{route}_PER_IP / RATE_LIMIT_{route}_PER_USERNAME (ex. RATE_LIMIT_LOG_IN_PER_IP=30/60)
+class RateLimit:
+    def __init__(self, route: str):
+        self.route: str = route
+        setting: str = route.replace("-", "_")
+        self.per_ip: Tuple[int, float] = parse_rate(getattr(rate_limit_settings, f"{setting}_per_ip"))
+        self.per_username: Tuple[int, float] = parse_rate(
+            getattr(rate_limit_settings, f"{setting}_per_username")
+        )
+
+    async def __call__(self, request: Request) -> None:
+        if not rate_limit_settings.enabled:
+            return
+
+        buckets: List[Tuple[str, Tuple[int, float]]] = []
+        if request.client is not None:
+            buckets.append((f"rate-limit:{self.route}:ip:{request.client.host}", self.per_ip))
+        username: str | None = await self._get_username(request)
+        if username:
+            buckets.append((f"rate-limit:{self.route}:username:{username}", self.per_username))
+        if not buckets:
+            return
+
+        try:
+            allowed, retry_after_ms = await _TAKE_TOKEN(
+                keys=[key for key, _ in buckets],
+                args=[value for _, rate in buckets for value in rate],
+            )
+        except redis.RedisError as e:
+            metrics.errors += 1
+            logger.warning("rate limit check failed: %s", e)
+            return
+
+        if allowed:
+            metrics.allowed += 1
+            return
+        metrics.limited += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too Many Requests",
+            headers={"Retry-After": str(math.ceil(retry_after_ms / 1000))},
+        )
+
+    # request body의 username (FastAPI가 body를 먼저 읽어서 request에 저장해두므로 다시 읽어도 됨)
+    # body 형식이 잘못된 경우는 IP bucket만 확인 (body 검증 에러는 handler에서 422)
+    @staticmethod
+    async def _get_username(request: Request) -> str | None:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            return None
+        username = body.get("username") if isinstance(body, dict) else None
+        return username.strip().lower() if isinstance(username, str) else None
@@ -1,12 +1,36 @@
 # Refactoring 
 # CreateToDoRequest 모듈을 main 에서 가져옴
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, constr
 
 class CreateToDoRequest(BaseModel):
     contents : str
     is_done : bool
 
 
+# import 한 줄 -> 컬럼 길이(String(256))를 넘는 contents는 INSERT 전에 그 줄의 에러로 처리
+# (MySQL strict mode 에서는 multi-row INSERT 전체가 실패하므로)
+class ImportToDoRequest(BaseModel):
+    contents : constr(max_length=256)
+    is_done : bool
+
+
+# 여러 todo를 한 번에 수정/삭제할 때 대상 조건 (id 목록 또는 is_done)
+class ToDoFilter(BaseModel):
+    ids : List[int] | None = None
+    is_done : bool | None = None
+
+
+class BulkUpdateToDoRequest(BaseModel):
+    filter : ToDoFilter
+    is_done : bool
+
+
+class BulkDeleteToDoRequest(BaseModel):
+    filter : ToDoFilter
+
+
 class SignUpRequest(BaseModel):
     username : str
     password : str
@@ -3,6 +3,8 @@
 # 지금은 응답의 구조가 단순하지만, 복잡하다면 미리 Response 객체를 분리하면,
 # 더 유연하게 API 사용 가능
 
+from datetime import date
+
 from pydantic import BaseModel
 from typing import List
 
@@ -19,6 +21,35 @@ class ToDoSchema(BaseModel):
 
 class ToDoListSchema(BaseModel):
     todos: List[ToDoSchema]
+    next_cursor: str | None = None  # 다음 페이지가 없으면 None
+
+class BulkUpdateToDoResponse(BaseModel):
+    updated: int
+
+class BulkDeleteToDoResponse(BaseModel):
+    deleted: int
+
+class DailyCompletionSchema(BaseModel):
+    day: date
+    completed: int
+
+    class Config:
+        orm_mode = True
+
+class ToDoStatsSchema(BaseModel):
+    total: int
+    done: int
+    pending: int
+    daily_completions: List[DailyCompletionSchema] | None = None  # days 를 요청한 경우만
+
+class ImportErrorSchema(BaseModel):
+    line: int
+    error: str
+
+class ImportToDoResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportErrorSchema]  # 최대 TODO_IMPORT_MAX_ERRORS 개
 
 class UserSchema(BaseModel):
     id: int
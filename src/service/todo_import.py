@@ -0,0 +1,104 @@
+# todo import (NDJSON / CSV) 파싱
+# request body를 한 번에 읽지 않고 chunk 단위로 받아서 한 줄(한 건)씩 넘겨줌
+# 한 줄(한 건)의 길이는 max_length 까지 -> 넘으면 그 줄의 에러로 처리하고 다음 줄부터 다시 읽음 (메모리 사용량 제한)
+import codecs
+import csv
+from typing import AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+
+from schema.request import ImportToDoRequest
+
+LINE_TOO_LONG: str = "line too long"
+
+
+# bytes chunk -> 줄 단위 문자열 (chunk 경계에서 잘린 줄/UTF-8 문자도 이어 붙임)
+# max_length 를 넘는 줄은 버리고 그 자리에 None
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int) -> AsyncIterator[str | None]:
+    decoder = codecs.getincrementaldecoder("UTF-8")(errors="replace")
+    buffer: str = ""
+    too_long: bool = False  # 지금 읽고 있는 줄이 이미 max_length를 넘음 -> 줄바꿈까지 버림
+    async for chunk in chunks:
+        *lines, rest = decoder.decode(chunk).split("\n")
+        for line in lines:
+            line, buffer = buffer + line, ""
+            if too_long or len(line) > max_length:
+                too_long = False
+                yield None
+            else:
+                yield line.rstrip("\r")
+        if not too_long:
+            buffer += rest
+            if len(buffer) > max_length:
+                buffer, too_long = "", True
+    buffer += decoder.decode(b"", final=True)
+    if too_long or len(buffer) > max_length:
+        yield None
+    elif buffer:
+        yield buffer.rstrip("\r")
+
+
+# (줄 번호, 검증된 request 또는 에러 메시지)
+ParsedLine = Tuple[int, ImportToDoRequest | str]
+
+
+async def parse_ndjson(lines: AsyncIterator[str | None]) -> AsyncIterator[ParsedLine]:
+    line_no: int = 0
+    async for line in lines:
+        line_no += 1
+        if line is None:
+            yield line_no, LINE_TOO_LONG
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, ImportToDoRequest.parse_raw(line)
+        except ValidationError as e:
+            yield line_no, _error_message(e)
+
+
+async def parse_csv(lines: AsyncIterator[str | None], max_length: int) -> AsyncIterator[ParsedLine]:
+    header: List[str] | None = None
+    line_no: int = 0
+    record: List[str] = []  # 따옴표 안의 줄바꿈으로 이어지는 줄들
+    record_length: int = 0
+    record_line_no: int = 0  # record가 시작된 줄 번호
+    quoted: bool = False  # 따옴표가 열린 상태로 줄이 끝남
+    async for line in lines:
+        line_no += 1
+        if line is None:
+            record, record_length, quoted = [], 0, False
+            yield line_no, LINE_TOO_LONG
+            continue
+        if not record:
+            record_line_no = line_no
+        record.append(line)
+        record_length += len(line) + 1
+        # 새 줄의 따옴표만 셈 ("" 는 짝수라 상태가 바뀌지 않음)
+        if line.count('"') % 2:
+            quoted = not quoted
+        if quoted:
+            # 닫는 따옴표 없이 길어지면 그 record는 에러, 다음 줄부터 새 record
+            if record_length > max_length:
+                record, record_length, quoted = [], 0, False
+                yield record_line_no, LINE_TOO_LONG
+            continue
+        fields: List[str] = next(csv.reader(["\n".join(record)]), [])
+        record, record_length = [], 0
+        if not fields:
+            continue
+        if header is None:
+            header = fields  # 첫 줄은 header (ex. id,contents,is_done)
+            continue
+        try:
+            yield line_no, ImportToDoRequest.parse_obj(dict(zip(header, fields)))
+        except ValidationError as e:
+            yield line_no, _error_message(e)
+    if record:
+        yield record_line_no, "unterminated quoted field"
+
+
+def _error_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+    )
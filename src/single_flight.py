@@ -0,0 +1,144 @@
+# Single-flight : 같은 key의 동시 요청은 한 번만 실행하고 결과를 나눠 가짐
+# ex) 인기 있는 user의 목록 cache가 만료된 순간 들어온 GET /todos 여러 개 -> DB 조회 / 직렬화 1번
+#
+# worker 안 : 먼저 온 요청(leader)이 실행하고, 나머지(waiter)는 그 결과를 기다림
+# worker 사이 (선택) : Redis lock(SET NX PX)을 얻은 worker만 실행하고, 다른 worker는 cache에 값이 채워질 때까지 기다림
+# 기다리는 시간은 CACHE_SINGLE_FLIGHT_TIMEOUT 까지 -> 넘으면 직접 실행
+#
+# 결과는 여러 요청이 같이 쓰므로 바꿀 수 없는 값(ex. 직렬화한 JSON 문자열)이어야 함
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+import redis
+
+from cache import redis_client
+from config import cache_settings
+
+logger = logging.getLogger(__name__)
+
+# lock을 얻었을 때 넣은 값과 같을 때만 삭제 (다른 worker가 TTL 이후에 다시 얻은 lock은 지우지 않음)
+_RELEASE_LOCK = redis_client.script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+class SingleFlightMetrics:
+    def __init__(self):
+        self.calls: int = 0  # 직접 실행한 수
+        self.shared: int = 0  # 다른 요청의 결과를 받은 수 (같은 worker)
+        self.remote_shared: int = 0  # 다른 worker가 채운 cache를 받은 수
+        self.timeouts: int = 0  # 기다리다가 직접 실행한 수
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "remote_shared": self.remote_shared,
+            "timeouts": self.timeouts,
+        }
+
+
+class SingleFlight:
+    def __init__(self):
+        self.metrics = SingleFlightMetrics()
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    # poll : 다른 worker가 채운 결과를 확인하는 함수 (없으면 None) -> 지정하면 Redis lock 사용
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        poll: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        future: asyncio.Future | None = self._calls.get(key)
+        if future is not None:
+            return await self._wait(future, func)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            if poll is not None and cache_settings.enabled and cache_settings.single_flight_lock:
+                result: Any = await self._do_with_lock(key, func, poll)
+            else:
+                result: Any = await self._call(func)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 요청이 없어도 경고가 나지 않도록 확인 처리
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    async def _call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.metrics.calls += 1
+        return await func()
+
+    async def _wait(self, future: asyncio.Future, func: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result: Any = await asyncio.wait_for(
+                asyncio.shield(future), timeout=cache_settings.single_flight_timeout
+            )
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+        except asyncio.CancelledError:
+            if not future.cancelled():  # 이 요청이 취소됨
+                raise
+            # leader 요청이 취소됨 (ex. client 연결 끊김) -> 직접 실행
+        else:
+            self.metrics.shared += 1
+            return result
+        return await self._call(func)
+
+    async def _do_with_lock(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        poll: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        lock_key: str = f"single-flight:{key}"
+        token: str = uuid.uuid4().hex
+        try:
+            acquired: bool = await redis_client.set(
+                lock_key,
+                token,
+                nx=True,
+                px=int(cache_settings.single_flight_lock_ttl * 1000),
+            )
+        except redis.RedisError:
+            logger.warning("single flight lock failed", exc_info=True)
+            return await self._call(func)
+
+        if acquired:
+            try:
+                return await self._call(func)
+            finally:
+                try:
+                    await _RELEASE_LOCK(keys=[lock_key], args=[token])
+                except redis.RedisError:
+                    logger.warning("single flight unlock failed", exc_info=True)
+
+        # 다른 worker가 실행 중 -> cache에 값이 채워지는지 확인
+        loop = asyncio.get_running_loop()
+        deadline: float = loop.time() + cache_settings.single_flight_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(cache_settings.single_flight_poll_interval)
+            result: Any = await poll()
+            if result is not None:
+                self.metrics.remote_shared += 1
+                return result
+        self.metrics.timeouts += 1
+        return await self._call(func)
+
+
+# worker(프로세스) 하나에 하나
+single_flight = SingleFlight()
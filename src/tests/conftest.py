@@ -1,5 +1,20 @@
+import asyncio
+from typing import Dict, List
+
 import pytest
+import redis
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+import database.connection as connection
+import single_flight
+import tiered_cache
+from tiered_cache import missing_todo_cache, missing_user_cache, todo_list_cache, user_lookup_cache
+from config import DatabaseSettings, cache_settings, rate_limit_settings
+from database.connection import create_session_factory
+from database.orm import Base
+from database.query_count import QueryCounter, observe_query_counts
 from main import app
 
 
@@ -12,3 +27,59 @@ def client():
 
 
 
+
+
+# 테스트는 Redis 없이 실행 (cache, 요청 수 제한을 검사하는 테스트에서만 다시 켬)
+# worker 메모리 cache는 테스트마다 비움 (다른 테스트의 mocking 결과가 남지 않도록)
+@pytest.fixture(autouse=True)
+def disable_cache(mocker):
+    mocker.patch.object(cache_settings, "enabled", False)
+    mocker.patch.object(rate_limit_settings, "enabled", False)
+    local_caches = [todo_list_cache, user_lookup_cache, missing_todo_cache.cache, missing_user_cache.cache]
+    for cache in local_caches:
+        cache.local.clear()
+    yield
+    for cache in local_caches:
+        cache.local.clear()
+
+
+# cache를 켜고 Redis는 연결할 수 없는 상태 -> L1, "없음" cache 만 동작 (L2 는 에러 후 DB에서 조회)
+@pytest.fixture
+def local_cache_only(mocker):
+    mocker.patch.object(cache_settings, "enabled", True)
+    for module in (tiered_cache, single_flight):
+        client = mocker.patch.object(module, "redis_client", new=mocker.MagicMock())
+        client.get = mocker.AsyncMock(side_effect=redis.ConnectionError)
+        client.set = mocker.AsyncMock(side_effect=redis.ConnectionError)
+        client.pipeline.return_value.execute = mocker.AsyncMock(side_effect=redis.ConnectionError)
+    mocker.patch.object(tiered_cache, "_GET_TODO_LIST", side_effect=redis.ConnectionError)
+    mocker.patch.object(tiered_cache, "_GET_GENERATION", side_effect=redis.ConnectionError)
+
+
+# repository를 mocking 하지 않고 sqlite 파일 DB로 app 전체를 실행
+@pytest.fixture
+def sqlite_client(tmp_path, mocker):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'todos.db'}", poolclass=NullPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    mocker.patch.object(
+        connection, "AsyncSessionFactory", create_session_factory(engine, [], DatabaseSettings())
+    )
+    yield TestClient(app=app)
+    asyncio.run(engine.dispose())
+
+
+# 요청마다 실행한 SQL 개수 -> {"GET /todos": [2, 2], ...}
+@pytest.fixture
+def query_counts():
+    counts: Dict[str, List[int]] = {}
+
+    def observe(name: str, counter: QueryCounter) -> None:
+        counts.setdefault(name, []).append(counter.count)
+
+    with observe_query_counts(observe):
+        yield counts
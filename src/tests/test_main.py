@@ -1,5 +1,31 @@
+import pytest
+
+import api.internal as internal
+from config import internal_settings
+
 
 def test_health_check(client):
     response = client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"ping" : "pong"}
\ No newline at end of file
+    assert response.json() == {"ping" : "pong"}
+
+def test_pool_status(client, mocker):
+    mocker.patch.object(internal_settings, "token", "secret")
+    response = client.get("/internal/pool", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert {"size", "checked_out", "overflow", "avg_wait_ms", "max_wait_ms"} <= set(response.json())
+
+
+@pytest.mark.parametrize("path", ["/internal/pool", "/internal/cache", "/internal/rate-limit"])
+def test_internal_access(client, mocker, path):
+    # token이 없으면 loopback 에서 직접 온 요청만 (TestClient의 client host는 "testclient")
+    assert client.get(path).status_code == 403
+    mocker.patch.object(internal, "LOOPBACK_HOSTS", {"testclient"})
+    assert client.get(path).status_code == 200
+    assert client.get(path, headers={"X-Forwarded-For": "203.0.113.1"}).status_code == 403
+
+    # token이 있으면 loopback 이어도 token 필요
+    mocker.patch.object(internal_settings, "token", "secret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get(path, headers={"Authorization": "Bearer secret"}).status_code == 200
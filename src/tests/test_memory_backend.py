@@ -0,0 +1,106 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import text
+
+from config import DatabaseSettings
+from database.connection import create_engine_from_settings
+from database.memory import MemoryToDoRepository, MemoryUserRepository, ToDoRow, _today, store
+from database.orm import ToDo
+from database.storage import get_todo_repository, get_user_repository
+from main import app
+
+# DB_BACKEND=memory 와 같은 상태로 mocking 없이 API 전체 흐름을 실행해봄
+
+
+@pytest.fixture
+def memory_client(client):
+    store.clear()
+    app.dependency_overrides[get_todo_repository] = MemoryToDoRepository
+    app.dependency_overrides[get_user_repository] = MemoryUserRepository
+    yield client
+    app.dependency_overrides.clear()
+    store.clear()
+
+
+def test_memory_backend_end_to_end(memory_client):
+    client = memory_client
+    response = client.post("/users/sign-up", json={"username": "test", "password": "plain"})
+    assert response.status_code == 201
+    assert response.json() == {"id": 1, "username": "test"}
+    response = client.post("/users/sign-up", json={"username": "test", "password": "plain"})
+    assert response.status_code == 409
+
+    response = client.post("/users/log-in", json={"username": "test", "password": "plain"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    body = "\n".join(f'{{"contents": "todo {i}", "is_done": false}}' for i in range(1, 6))
+    response = client.post("/todos/import", content=body, headers=headers)
+    assert response.json()["imported"] == 5
+
+    # pagination (DESC)
+    response = client.get("/todos?order=DESC&limit=2", headers=headers)
+    assert [todo["id"] for todo in response.json()["todos"]] == [5, 4]
+    cursor = response.json()["next_cursor"]
+    response = client.get(f"/todos?order=DESC&limit=2&cursor={cursor}", headers=headers)
+    assert [todo["id"] for todo in response.json()["todos"]] == [3, 2]
+
+    response = client.patch("/todos/1", json={"is_done": True})
+    assert response.json() == {"id": 1, "contents": "todo 1", "is_done": True}
+    # 같은 id가 여러 번 있어도 한 번만 수정 / 삭제
+    response = client.patch(
+        "/todos", json={"filter": {"ids": [2, 3, 3, 2]}, "is_done": True}, headers=headers
+    )
+    assert response.json() == {"updated": 2}
+
+    response = client.get("/todos/stats?days=1", headers=headers)
+    assert response.json()["done"] == 3
+    assert response.json()["pending"] == 2
+    assert response.json()["daily_completions"][0]["completed"] == 3
+
+    response = client.get("/todos/search?q=todo 4", headers=headers)
+    assert response.json()["todos"][0]["id"] == 4
+
+    response = client.request(
+        "DELETE", "/todos", json={"filter": {"ids": [1, 1, 2, 3], "is_done": True}}, headers=headers
+    )
+    assert response.json() == {"deleted": 3}
+    assert client.delete("/todos/4").status_code == 204
+    assert client.get("/todos/4").status_code == 404
+
+    response = client.get("/todos/export", headers=headers)
+    assert response.text == '{"id": 5, "contents": "todo 5", "is_done": false}\n'
+
+
+def test_memory_backend_daily_completions():
+    # SQL 저장소와 같음 : 완료 상태로 생성하면 오늘 +1, 되돌리면 완료한 날 -1
+    store.clear()
+    yesterday = _today() - timedelta(days=1)
+    store.todos[1] = ToDoRow(1, "yesterday", True, 1, yesterday)
+    store.todo_ids_by_user[1] = [1]
+    store.last_todo_id = 1
+    store.daily_completions[(1, yesterday)] = 1
+    todo_repo = MemoryToDoRepository()
+
+    async def _run():
+        await todo_repo.insert_todo_rows(rows=[{"contents": "done", "is_done": True, "user_id": 1}])
+        await todo_repo.create_todo(todo=ToDo(contents="done", is_done=True, user_id=1))
+        assert await todo_repo.update_todos(user_id=1, set_is_done=False, ids=[1, 2]) == 2
+
+    asyncio.run(_run())
+    assert store.daily_completions == {(1, yesterday): 0, (1, _today()): 1}
+    store.clear()
+
+
+def test_sqlite_backend_pragmas(tmp_path):
+    async def _run():
+        engine = create_engine_from_settings(
+            DatabaseSettings(backend="sqlite", url=f"sqlite+aiosqlite:///{tmp_path / 'todos.db'}")
+        )
+        async with engine.connect() as conn:
+            assert (await conn.scalar(text("PRAGMA journal_mode"))) == "wal"
+            assert (await conn.scalar(text("PRAGMA synchronous"))) == 1  # NORMAL
+        await engine.dispose()
+
+    asyncio.run(_run())
@@ -0,0 +1,97 @@
+import pytest
+
+from tiered_cache import user_lookup_cache
+from config import database_settings, todo_settings
+from database.query_count import QueryBudgetExceededError, QueryCounter, check_query_budget
+
+# 실제 sqlite DB로 요청을 보내고 요청마다 실행한 SQL 개수를 검사 (N+1 쿼리가 생기면 실패)
+
+
+def _log_in(client) -> dict:
+    client.post("/users/sign-up", json={"username": "test", "password": "plain"})
+    response = client.post("/users/log-in", json={"username": "test", "password": "plain"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _import_todos(client, headers: dict, count: int) -> None:
+    body = "\n".join(f'{{"contents": "todo {i}", "is_done": false}}' for i in range(count))
+    response = client.post("/todos/import", content=body, headers=headers)
+    assert response.json()["imported"] == count
+
+
+def test_get_todos_query_count(sqlite_client, query_counts, local_cache_only):
+    headers = _log_in(sqlite_client)
+
+    _import_todos(sqlite_client, headers, count=1)
+    assert sqlite_client.get("/todos", headers=headers).status_code == 200
+    _import_todos(sqlite_client, headers, count=50)
+    response = sqlite_client.get("/todos", headers=headers)
+    assert len(response.json()["todos"]) == 51
+
+    # todo 개수와 관계없이 목록 조회 1번 (user는 import 요청에서 cache 됨)
+    assert query_counts["GET /todos"] == [1, 1]
+
+    # user cache가 비어 있으면 user 조회 1번 + 목록 조회 1번
+    user_lookup_cache.local.clear()
+    sqlite_client.get("/todos", headers=headers)
+    assert query_counts["GET /todos"][-1] == 2
+
+
+def test_todo_reads_query_count(sqlite_client, query_counts, mocker, local_cache_only):
+    mocker.patch.object(database_settings, "query_budget_mode", "strict")
+    headers = _log_in(sqlite_client)
+    _import_todos(sqlite_client, headers, count=10)
+
+    assert sqlite_client.get("/todos/1").status_code == 200
+    assert sqlite_client.get("/todos/stats?days=7", headers=headers).status_code == 200
+    assert sqlite_client.get("/todos/search?q=todo", headers=headers).status_code == 200
+
+    assert query_counts["GET /todos/{todo_id}"] == [1]
+    assert query_counts["GET /todos/stats"] == [2]
+    assert query_counts["GET /todos/search"] == [1]
+
+
+def test_write_query_count(sqlite_client, query_counts, mocker):
+    mocker.patch.object(database_settings, "query_budget_mode", "strict")
+    mocker.patch.object(todo_settings, "import_batch_size", 1)
+    mocker.patch.object(todo_settings, "bulk_batch_size", 1)
+    headers = _log_in(sqlite_client)
+
+    # import, bulk 생성은 batch 수 만큼 INSERT -> budget 검사 안함
+    _import_todos(sqlite_client, headers, count=20)
+    body = [{"contents": f"todo {i}", "is_done": False} for i in range(20)]
+    assert sqlite_client.post("/todos/bulk", json=body).status_code == 201
+    assert query_counts["POST /todos/import"][-1] > database_settings.query_budget
+
+    # 여러 개 수정 / 삭제는 todo 개수와 관계없음
+    body = {"filter": {"is_done": False}, "is_done": True}
+    assert sqlite_client.patch("/todos", json=body, headers=headers).json() == {"updated": 20}
+    # 완료 취소 -> 완료한 날 별 집계 UPDATE 한 번 + todo UPDATE 한 번
+    body = {"filter": {"ids": [1, 2, 3]}, "is_done": False}
+    assert sqlite_client.patch("/todos", json=body, headers=headers).json() == {"updated": 3}
+    assert query_counts["PATCH /todos"] == [3, 3]
+    body = {"filter": {"is_done": True}}
+    assert sqlite_client.request("DELETE", "/todos", json=body, headers=headers).json() == {"deleted": 17}
+
+
+def test_check_query_budget(caplog):
+    counter = QueryCounter()
+    for _ in range(3):
+        counter.record("SELECT todo.id FROM todo WHERE todo.id = ?")
+
+    check_query_budget("GET /todos", counter, budget=3, mode="strict")
+    check_query_budget("GET /todos", counter, budget=2, mode="off")
+
+    check_query_budget("GET /todos", counter, budget=2, mode="warn")
+    assert "GET /todos executed 3 queries (budget 2)" in caplog.text
+
+    with pytest.raises(QueryBudgetExceededError):
+        check_query_budget("GET /todos", counter, budget=2, mode="strict")
+    check_query_budget("POST /todos/import", counter, budget=None, mode="strict")
+
+    # 같은 statement는 한 번만 기록, 서로 다른 statement는 max_statements 개까지
+    assert counter.statements == {"SELECT todo.id FROM todo WHERE todo.id = ?": 3}
+    for i in range(QueryCounter.max_statements + 5):
+        counter.record(f"SELECT {i}")
+    assert counter.count == QueryCounter.max_statements + 8
+    assert len(counter.statements) == QueryCounter.max_statements
@@ -0,0 +1,62 @@
+import pytest
+import redis
+
+import rate_limit
+from config import rate_limit_settings
+from database.repository import UserRepository
+from rate_limit import parse_rate
+from service.user import UserService
+
+# Redis 없이 token bucket script를 mocking 해서 dependency 동작을 확인
+
+
+@pytest.fixture
+def take_token(mocker):
+    mocker.patch.object(rate_limit_settings, "enabled", True)
+    return mocker.patch.object(rate_limit, "_TAKE_TOKEN", new_callable=mocker.AsyncMock)
+
+
+def test_parse_rate():
+    assert parse_rate("10/60") == (10, 10 / 60)
+    with pytest.raises(ValueError):
+        parse_rate("0/60")
+
+
+def test_log_in_rate_limited(client, mocker, take_token):
+    get_user = mocker.patch.object(UserRepository, "get_user_by_username")
+    verify_password = mocker.patch.object(UserService, "verify_password")
+
+    # token 없음 -> DB 조회, bcrypt 전에 429
+    take_token.return_value = [0, 1500]
+    response = client.post("/users/log-in", json={"username": " Test ", "password": "plain"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    get_user.assert_not_called()
+    verify_password.assert_not_called()
+
+    # client IP, username 별 bucket을 한 번에 확인
+    keys = take_token.call_args.kwargs["keys"]
+    assert keys == ["rate-limit:log-in:ip:testclient", "rate-limit:log-in:username:test"]
+    assert take_token.call_args.kwargs["args"] == [
+        *parse_rate(rate_limit_settings.log_in_per_ip),
+        *parse_rate(rate_limit_settings.log_in_per_username),
+    ]
+
+
+def test_sign_up_rate_limit_allowed(client, mocker, take_token):
+    mocker.patch.object(UserService, "hash_password", return_value="hashed")
+    save_user = mocker.patch.object(UserRepository, "save_user")
+
+    # body에 username이 없는 경우도 IP bucket은 확인
+    take_token.return_value = [0, 1000]
+    assert client.post("/users/sign-up", json=["test"]).status_code == 429
+    assert take_token.call_args.kwargs["keys"] == ["rate-limit:sign-up:ip:testclient"]
+
+    # token 있음 -> 원래대로 처리 (validation 에러)
+    take_token.return_value = [1, 0]
+    assert client.post("/users/sign-up", json={"username": "test"}).status_code == 422
+
+    # Redis에 문제가 있으면 제한하지 않음
+    take_token.side_effect = redis.ConnectionError
+    assert client.post("/users/sign-up", json={"username": "test"}).status_code == 422
+    save_user.assert_not_called()
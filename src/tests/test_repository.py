@@ -0,0 +1,453 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import redis
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database.connection as connection
+import database.routing as routing
+from config import DatabaseSettings, database_settings
+from database.connection import create_engine_from_settings, create_session_factory
+from database.orm import Base, ToDo, ToDoDailyCompletion, User
+from database.repository import ToDoRepository, UserRepository
+from database.routing import ReadYourWrites
+from database.schema import (
+    MissingIndexError, check_schema, create_schema, find_missing_columns, find_missing_indexes
+)
+
+# repository는 mocking 하지 않고 sqlite(in-memory, aiosqlite)로 실제 쿼리를 실행해봄
+# pip install aiosqlite
+
+
+def run(test):
+    async def _run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False
+        )
+        async with session_factory() as session:
+            await test(session)
+        await engine.dispose()
+
+    asyncio.run(_run())
+
+
+def test_get_todos_by_user_id():
+    async def test(session):
+        user = User(id=1, username="test", password="hashed")
+        other = User(id=2, username="other", password="hashed")
+        session.add_all([user, other])
+        session.add_all(
+            [ToDo(id=i, contents=f"todo {i}", is_done=False, user_id=1) for i in range(1, 6)]
+            + [ToDo(id=6, contents="other", is_done=False, user_id=2)]
+        )
+        await session.commit()
+
+        todo_repo = ToDoRepository(session=session)
+
+        todos = await todo_repo.get_todos_by_user_id(user_id=1, limit=2)
+        assert [todo.id for todo in todos] == [1, 2]
+
+        todos = await todo_repo.get_todos_by_user_id(user_id=1, limit=2, after_id=2)
+        assert [todo.id for todo in todos] == [3, 4]
+
+        todos = await todo_repo.get_todos_by_user_id(user_id=1, order="DESC", limit=10, after_id=3)
+        assert [todo.id for todo in todos] == [2, 1]
+
+        # id, contents, is_done 컬럼만 조회
+        assert todos[0]._fields == ("id", "contents", "is_done")
+
+    run(test)
+
+
+def test_create_todos():
+    async def test(session):
+        todo_repo = ToDoRepository(session=session)
+        todos = await todo_repo.create_todos(
+            todos=[ToDo(contents=f"todo {i}", is_done=False) for i in range(5)],
+            batch_size=2,
+        )
+        assert [todo.id for todo in todos] == [1, 2, 3, 4, 5]
+        assert [todo.contents for todo in await todo_repo.get_todos()] == [
+            f"todo {i}" for i in range(5)
+        ]
+
+    run(test)
+
+
+def test_create_todos_without_returning(mocker):
+    # MySQL 처럼 RETURNING이 없고 id가 연속이라는 보장도 없음 (innodb_autoinc_lock_mode=2) -> row 마다 INSERT
+    async def test(session):
+        dialect = session.get_bind().dialect
+        mocker.patch.object(dialect, "insert_executemany_returning_sort_by_parameter_order", False)
+        get_step = mocker.patch.object(ToDoRepository, "_get_autoinc_step", return_value=None)
+        todo_repo = ToDoRepository(session=session)
+        todos = await todo_repo.create_todos(
+            todos=[ToDo(contents=f"todo {i}", is_done=False) for i in range(3)],
+            batch_size=2,
+        )
+        assert [todo.id for todo in todos] == [1, 2, 3]
+        get_step.assert_awaited_once()
+
+    run(test)
+
+
+def test_update_and_delete_todos():
+    async def test(session):
+        session.add_all(
+            [ToDo(id=i, contents=f"todo {i}", is_done=i % 2 == 0, user_id=1) for i in range(1, 5)]
+            + [ToDo(id=5, contents="other", is_done=False, user_id=2)]
+        )
+        await session.commit()
+        todo_repo = ToDoRepository(session=session)
+
+        # 다른 user의 todo는 수정되지 않음
+        assert await todo_repo.update_todos(user_id=1, set_is_done=True, is_done=False) == 2
+        assert await todo_repo.delete_todos(user_id=1, ids=[1, 2, 5]) == 2
+        assert await todo_repo.delete_todos(user_id=1, is_done=True) == 2
+        assert [todo.id for todo in await todo_repo.get_todos()] == [5]
+
+    run(test)
+
+
+def test_single_statement_writes():
+    async def test(session):
+        todo_repo = ToDoRepository(session=session)
+        todo = await todo_repo.create_todo(todo=ToDo(contents="todo", is_done=False))
+        assert todo.id == 1
+
+        updated = await todo_repo.update_todo_is_done(todo_id=1, is_done=True)
+        assert (updated.id, updated.contents, updated.is_done) == (1, "todo", True)
+        assert await todo_repo.update_todo_is_done(todo_id=2, is_done=True) is None
+
+        deleted = await todo_repo.delete_todo(todo_id=1)
+        assert (deleted.id, deleted.user_id) == (1, None)
+        assert await todo_repo.delete_todo(todo_id=1) is None
+
+    run(test)
+
+
+def test_delete_todo_without_returning(mocker):
+    # MySQL 처럼 RETURNING이 없는 경우 -> 소유자가 필요 없으면 DELETE 한 번
+    async def test(session):
+        mocker.patch.object(session.get_bind().dialect, "delete_returning", False)
+        todo_repo = ToDoRepository(session=session)
+        await todo_repo.create_todo(todo=ToDo(contents="todo", is_done=False))
+        await todo_repo.create_todo(todo=ToDo(contents="todo", is_done=False))
+        statements = []
+        event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        assert tuple(await todo_repo.delete_todo(todo_id=1, with_owner=False)) == (1, None)
+        assert len(statements) == 1 and statements[0].startswith("DELETE")
+        assert await todo_repo.delete_todo(todo_id=1, with_owner=False) is None
+
+        # 소유자가 필요하면 잠그고 조회 후 삭제
+        deleted = await todo_repo.delete_todo(todo_id=2)
+        assert (deleted.id, deleted.user_id) == (2, None)
+
+    run(test)
+
+
+def test_todo_stats_and_daily_completions():
+    async def test(session):
+        session.add(User(id=1, username="test", password="hashed"))
+        session.add_all(
+            [ToDo(id=i, contents=f"todo {i}", is_done=False, user_id=1) for i in range(1, 5)]
+        )
+        await session.commit()
+        todo_repo = ToDoRepository(session=session)
+
+        await todo_repo.update_todo_is_done(todo_id=1, is_done=True)
+        await todo_repo.update_todo_is_done(todo_id=1, is_done=True)  # 이미 완료 -> 집계 안됨
+        assert await todo_repo.update_todos(user_id=1, set_is_done=True, ids=[2, 3]) == 2
+        await todo_repo.update_todo_is_done(todo_id=3, is_done=False)
+
+        assert await todo_repo.get_todo_stats(user_id=1) == {True: 2, False: 2}
+        completions = await todo_repo.get_daily_completions(user_id=1, since=date.min)
+        assert [completion.completed for completion in completions] == [2]
+
+        # 완료 상태로 생성/import 한 todo도 오늘 완료 수에 더하고, 되돌리면 다시 뺌
+        await todo_repo.insert_todo_rows(rows=[{"contents": "done", "is_done": True, "user_id": 1}])
+        await todo_repo.create_todos(todos=[ToDo(contents="done", is_done=True, user_id=1)])
+        assert await todo_repo.update_todos(user_id=1, set_is_done=False, is_done=True) == 4
+        session.expire_all()  # 위에서 읽은 집계 객체를 다시 읽음 (요청마다 session은 새로 만들어짐)
+        completions = await todo_repo.get_daily_completions(user_id=1, since=date.min)
+        assert [completion.completed for completion in completions] == [0]
+
+    run(test)
+
+
+def test_undo_completion_on_completed_day():
+    # 어제 완료한 todo를 오늘 되돌리면 어제의 완료 수에서 뺌 (오늘 완료 수는 그대로)
+    async def test(session):
+        today = datetime.now(timezone.utc).date()
+        yesterday = today - timedelta(days=1)
+        session.add(User(id=1, username="test", password="hashed"))
+        session.add_all([
+            ToDo(id=i, contents=f"todo {i}", is_done=True, user_id=1, completed_on=yesterday)
+            for i in range(1, 4)
+        ])
+        # 완료한 날짜가 없는 이전 데이터 -> 되돌려도 집계에 반영 안됨
+        session.add(ToDo(id=4, contents="legacy", is_done=True, user_id=1))
+        session.add(ToDoDailyCompletion(user_id=1, day=yesterday, completed=3))
+        await session.commit()
+        todo_repo = ToDoRepository(session=session)
+
+        await todo_repo.update_todo_is_done(todo_id=1, is_done=False)
+        await todo_repo.update_todo_is_done(todo_id=4, is_done=False)
+        assert await todo_repo.update_todos(user_id=1, set_is_done=False, ids=[2, 3, 4]) == 2
+        # 다시 완료하면 오늘
+        await todo_repo.update_todo_is_done(todo_id=1, is_done=True)
+
+        session.expire_all()
+        completions = await todo_repo.get_daily_completions(user_id=1, since=date.min)
+        assert [(completion.day, completion.completed) for completion in completions] == [
+            (yesterday, 0), (today, 1)
+        ]
+        assert (await todo_repo.get_todo_by_todo_id(todo_id=1)).completed_on == today
+
+    run(test)
+
+
+def test_search_todos():
+    async def test(session):
+        session.add_all([
+            ToDo(id=1, contents="buy milk", is_done=False, user_id=1),
+            ToDo(id=2, contents="buy milk and eggs", is_done=False, user_id=1),
+            ToDo(id=3, contents="eggs", is_done=False, user_id=1),
+            ToDo(id=4, contents="100% done", is_done=False, user_id=1),
+            ToDo(id=5, contents="buy milk", is_done=False, user_id=2),
+        ])
+        await session.commit()
+        todo_repo = ToDoRepository(session=session)
+
+        todos = await todo_repo.search_todos(user_id=1, query="milk eggs", limit=2)
+        assert [todo.id for todo in todos] == [2, 3]
+        todos = await todo_repo.search_todos(
+            user_id=1, query="milk eggs", after=(todos[-1].score, todos[-1].id)
+        )
+        assert [todo.id for todo in todos] == [1]
+        # LIKE 특수문자(%)는 escape
+        assert [todo.id for todo in await todo_repo.search_todos(user_id=1, query="%")] == [4]
+
+    run(test)
+
+
+def test_stream_todos_by_user_id(tmp_path):
+    async def _run():
+        # server-side cursor 는 in-memory가 아닌 파일 DB로 확인
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stream.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                ToDo.__table__.insert(),
+                [{"id": i, "contents": f"todo {i}", "is_done": False, "user_id": 1} for i in range(1, 6)],
+            )
+        async with AsyncSession(engine) as session:
+            batches = [
+                [row.id for row in batch]
+                async for batch in ToDoRepository(session=session).stream_todos_by_user_id(
+                    user_id=1, batch_size=2
+                )
+            ]
+        assert batches == [[1, 2], [3, 4], [5]]
+        await engine.dispose()
+
+    asyncio.run(_run())
+
+
+@pytest.mark.parametrize("prebuilt", [True, False])
+def test_prebuilt_statements(prebuilt, mocker):
+    mocker.patch.object(database_settings, "prebuilt_statements", prebuilt)
+
+    async def test(session):
+        session.add(User(id=1, username="test", password="hashed"))
+        session.add_all([ToDo(id=i, contents=f"todo {i}", is_done=False, user_id=1) for i in (1, 2)])
+        await session.commit()
+        todo_repo = ToDoRepository(session=session)
+
+        assert (await todo_repo.get_todo_by_todo_id(todo_id=2)).contents == "todo 2"
+        assert (await UserRepository(session=session).get_user_by_username(username="test")).id == 1
+        todos = await todo_repo.get_todos_by_user_id(user_id=1, order="DESC", limit=1, after_id=2)
+        assert [todo.id for todo in todos] == [1]
+
+    run(test)
+
+
+def test_get_user_by_username_does_not_load_todos():
+    async def test(session):
+        session.add(User(id=1, username="test", password="hashed"))
+        session.add(ToDo(id=1, contents="todo", is_done=False, user_id=1))
+        await session.commit()
+        session.expunge_all()
+
+        user = await UserRepository(session=session).get_user_by_username(username="test")
+        assert user.id == 1
+        assert "todos" not in user.__dict__
+
+    run(test)
+
+
+def test_instrumented_pool_records_checkout_wait():
+    async def _run(tmp_url):
+        engine = create_engine_from_settings(DatabaseSettings(url=tmp_url, pool_size=1, max_overflow=0))
+        async with engine.connect():
+            assert engine.pool.checkedout() == 1
+        assert engine.pool.metrics.checkouts == 1
+        await engine.dispose()
+
+    asyncio.run(_run("sqlite+aiosqlite:///file:pool_test?mode=memory&cache=shared&uri=true"))
+
+
+def test_read_replica_routing(tmp_path):
+    settings = DatabaseSettings(read_your_writes_window=60)
+
+    async def _run():
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+        for engine in (primary, replica):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        # replica에만 있는 데이터로 어느 DB에서 읽었는지 확인
+        async with replica.begin() as conn:
+            await conn.execute(ToDo.__table__.insert().values(id=100, contents="replica", is_done=False))
+
+        session_factory = create_session_factory(primary, [replica], settings)
+
+        # 조회 -> replica
+        async with session_factory() as session:
+            session.info["rw_key"] = "reader"
+            todo_repo = ToDoRepository(session=session)
+            assert (await todo_repo.get_todo_by_todo_id(todo_id=100)).contents == "replica"
+
+        # 쓰기 -> primary, 같은 session의 이후 조회도 primary
+        async with session_factory() as session:
+            session.info["rw_key"] = "writer"
+            todo_repo = ToDoRepository(session=session)
+            todo = await todo_repo.create_todo(todo=ToDo(contents="primary", is_done=False))
+            assert await todo_repo.get_todo_by_todo_id(todo_id=todo.id) is not None
+            assert await todo_repo.get_todo_by_todo_id(todo_id=100) is None
+            await session.commit()  # 요청이 끝날 때 get_db에서 하는 commit
+
+        # read-your-writes window 안에서는 같은 client의 조회도 primary
+        async with session_factory() as session:
+            session.info["rw_key"] = "writer"
+            assert await ToDoRepository(session=session).get_todo_by_todo_id(todo_id=100) is None
+
+        # 다른 client는 replica
+        async with session_factory() as session:
+            session.info["rw_key"] = "reader"
+            assert await ToDoRepository(session=session).get_todo_by_todo_id(todo_id=100) is not None
+
+        # cache에 저장할 값은 primary에서
+        async with session_factory() as session:
+            session.info["rw_key"] = "reader"
+            todo_repo = ToDoRepository(session=session)
+            todo_repo.read_from_primary()
+            assert await todo_repo.get_todo_by_todo_id(todo_id=100) is None
+
+        await primary.dispose()
+        await replica.dispose()
+
+    asyncio.run(_run())
+
+
+def test_read_your_writes_shared(mocker):
+    # worker 사이 공유 -> Redis key를 window 동안 유지
+    client = mocker.patch.object(routing, "redis_client")
+    client.set = mocker.AsyncMock()
+    client.exists = mocker.AsyncMock(return_value=1)
+    read_your_writes = ReadYourWrites(window=5, shared=True)
+
+    asyncio.run(read_your_writes.mark_shared("Bearer token"))
+    key = client.set.call_args.args[0]
+    assert key.startswith("rw:") and "token" not in key
+    assert client.set.call_args.kwargs["px"] == 5000
+    # 다른 worker (이 worker의 기록 없음) 에서도 primary
+    assert asyncio.run(ReadYourWrites(window=5, shared=True).is_recent_shared("Bearer token"))
+
+    # Redis에 문제가 있으면 이 worker의 기록만 사용
+    client.exists.side_effect = redis.ConnectionError
+    assert not asyncio.run(read_your_writes.is_recent_shared("Bearer token"))
+    assert read_your_writes.is_recent("Bearer token") is False
+
+    # 공유하지 않는 설정이면 Redis 사용 안함
+    client.exists.reset_mock()
+    assert not asyncio.run(ReadYourWrites(window=5).is_recent_shared("Bearer token"))
+    client.exists.assert_not_called()
+
+
+def test_schema_create_and_verify(tmp_path):
+    async def _run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+        # index 없이 손으로 만든 테이블
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql(
+                "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(256) NOT NULL, password VARCHAR(256) NOT NULL)"
+            )
+            await conn.exec_driver_sql(
+                "CREATE TABLE todo (id INTEGER PRIMARY KEY, contents VARCHAR(256) NOT NULL, is_done BOOLEAN NOT NULL, user_id INTEGER REFERENCES user (id))"
+            )
+        missing = {index.name for index in await find_missing_indexes(engine)}
+        assert missing == {"ix_user_username", "ix_todo_user_id_id", "ix_todo_user_id_is_done_id"}
+        # 나중에 추가된 컬럼
+        assert [column.name for column in await find_missing_columns(engine)] == ["completed_on"]
+
+        with pytest.raises(MissingIndexError):
+            await check_schema(engine, mode="strict")
+
+        await create_schema(engine)
+        assert await find_missing_indexes(engine) == []
+        assert await find_missing_columns(engine) == []
+        await check_schema(engine, mode="strict")
+        await engine.dispose()
+
+    asyncio.run(_run())
+
+
+def test_unit_of_work(tmp_path, mocker):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'uow.db'}", poolclass=NullPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    session_factory = create_session_factory(engine, [], DatabaseSettings())
+    mocker.patch.object(connection, "AsyncSessionFactory", session_factory)
+    commits = []
+    event.listen(session_factory.kw["sync_session_class"], "after_commit", commits.append)
+
+    router = APIRouter(route_class=connection.UnitOfWorkRoute)
+
+    @router.post("/todos")
+    async def create_todos(fail: bool = False, todo_repo: ToDoRepository = Depends()):
+        # 여러 번 쓰기 -> commit은 한 번
+        await todo_repo.create_todo(todo=ToDo(contents="todo 1", is_done=False, user_id=1))
+        await todo_repo.create_todo(todo=ToDo(contents="todo 2", is_done=False, user_id=1))
+        if fail:
+            raise HTTPException(status_code=400, detail="Bad Request")
+        return {"ok": True}
+
+    @router.get("/todos")
+    async def get_todos(todo_repo: ToDoRepository = Depends()):
+        return [todo.contents for todo in await todo_repo.get_todos()]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    assert client.post("/todos").status_code == 200
+    assert len(commits) == 1
+    # 에러가 나면 rollback -> 저장되지 않음
+    assert client.post("/todos?fail=true").status_code == 400
+    assert client.get("/todos").json() == ["todo 1", "todo 2"]
+    # 조회만 한 요청은 commit 할 것이 없음
+    assert len(commits) == 1
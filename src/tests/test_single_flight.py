@@ -0,0 +1,79 @@
+import asyncio
+
+import single_flight as single_flight_module
+from config import cache_settings
+from single_flight import SingleFlight
+
+
+def test_single_flight_shares_result():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "todos"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do(key="todos:1", func=load) for _ in range(10)))
+        # 끝난 뒤의 요청은 새로 실행
+        results.append(await flight.do(key="todos:1", func=load))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ["todos"] * 11
+    assert len(calls) == 2
+    assert flight.metrics.shared == 9
+
+
+def test_single_flight_error_and_timeout(mocker):
+    mocker.patch.object(cache_settings, "single_flight_timeout", 0.01)
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("db error")
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    async def run():
+        flight = SingleFlight()
+        # leader의 에러는 기다리던 요청도 같이 받음
+        results = await asyncio.gather(
+            flight.do(key="a", func=fail), flight.do(key="a", func=fail), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+        # 기다리는 시간을 넘으면 직접 실행
+        results = await asyncio.gather(flight.do(key="b", func=slow), flight.do(key="b", func=fast))
+        assert results == ["slow", "fast"]
+        assert flight.metrics.timeouts == 1
+
+    asyncio.run(run())
+
+
+def test_single_flight_redis_lock(mocker):
+    mocker.patch.object(cache_settings, "enabled", True)
+    mocker.patch.object(cache_settings, "single_flight_poll_interval", 0.001)
+    redis_client = mocker.patch.object(single_flight_module, "redis_client")
+    redis_client.set = mocker.AsyncMock()
+    release = mocker.patch.object(single_flight_module, "_RELEASE_LOCK", new_callable=mocker.AsyncMock)
+    load = mocker.AsyncMock(return_value="from db")
+
+    # lock을 얻음 -> 직접 실행 후 lock 해제
+    redis_client.set.return_value = True
+    flight = SingleFlight()
+    assert asyncio.run(flight.do(key="todos:1", func=load, poll=mocker.AsyncMock())) == "from db"
+    assert redis_client.set.call_args.kwargs["nx"] is True
+    release.assert_awaited_once()
+
+    # 다른 worker가 lock을 가지고 있음 -> 그 worker가 cache를 채울 때까지 기다림
+    redis_client.set.return_value = None
+    poll = mocker.AsyncMock(side_effect=[None, "from cache"])
+    assert asyncio.run(flight.do(key="todos:1", func=load, poll=poll)) == "from cache"
+    assert load.await_count == 1
+    assert flight.metrics.remote_shared == 1
@@ -0,0 +1,183 @@
+import asyncio
+
+import pytest
+import redis
+
+import tiered_cache
+from cache import MISSING, RedisClient
+from config import RedisSettings, cache_settings
+from database.orm import User
+from database.repository import UserRepository
+from tiered_cache import InvalidationSubscriber, TieredCache, ToDoListCache, UserCache
+
+# Redis 없이 redis_client를 mocking 해서 L1 / L2 동작을 확인
+
+
+@pytest.fixture
+def redis_client(mocker):
+    mocker.patch.object(cache_settings, "enabled", True)
+    client = mocker.patch.object(tiered_cache, "redis_client", new=mocker.MagicMock())
+    # redis.asyncio client -> 명령은 await, pipeline은 명령을 쌓고 execute()만 await
+    client.get = mocker.AsyncMock()
+    client.set = mocker.AsyncMock()
+    client.pipeline.return_value.execute = mocker.AsyncMock()
+    return client
+
+
+def test_tiered_cache(redis_client):
+    cache = TieredCache("test", max_size=10, ttl=60, redis_ttl=600)
+
+    # L1 miss -> L2 hit -> L1 에 저장
+    redis_client.get.return_value = '[1, "test"]'
+    assert asyncio.run(cache.get("test")) == [1, "test"]
+    assert asyncio.run(cache.get("test")) == [1, "test"]
+    redis_client.get.assert_called_once_with("cache:test:test")
+
+    # 무효화 -> L1 / L2 삭제 + 다른 worker에 알림 (pipeline 한 번)
+    asyncio.run(cache.invalidate("test"))
+    pipe = redis_client.pipeline.return_value
+    pipe.delete.assert_called_once_with("cache:test:test")
+    pipe.publish.assert_called_once_with(cache_settings.invalidation_channel, "test:test")
+    assert cache.local.get("test") is MISSING
+
+    # 읽는 동안 같은 key의 무효화가 있었으면 읽은 값을 저장하지 않음
+    sequence = cache.sequence
+    cache.evict("test")
+    asyncio.run(cache.set("test", [2, "test"], sequence))
+    assert cache.local.get("test") is MISSING
+    redis_client.set.assert_not_called()
+
+    # 다른 key의 무효화는 관계없음
+    sequence = cache.sequence
+    cache.evict("other")
+    asyncio.run(cache.set("test", [3, "test"], sequence))
+    assert cache.local.get("test") == [3, "test"]
+
+    # 전체 무효화("*") 는 모든 key
+    sequence = cache.sequence
+    cache.evict("*")
+    cache.set_local("test", [4, "test"], sequence)
+    assert cache.local.get("test") is MISSING
+
+
+def test_tiered_cache_invalidation_records(redis_client):
+    # 무효화 기록은 max_size 개까지, 밀려난 기록보다 먼저 읽기 시작한 값은 저장하지 않음
+    cache = TieredCache("test", max_size=2, ttl=60, redis_ttl=None)
+    sequence = cache.sequence
+    for key in ("a", "b", "c"):
+        cache.evict(key)
+    assert cache.is_stale("a", sequence)
+    assert cache.is_stale("z", sequence)
+    assert not cache.is_stale("z", cache.sequence)
+
+
+def test_todo_list_cache_local(redis_client, mocker):
+    script = mocker.patch.object(
+        tiered_cache, "_GET_TODO_LIST", new_callable=mocker.AsyncMock, return_value=["3", None]
+    )
+    todo_cache = ToDoListCache()
+
+    # 첫 조회는 Redis, DB에서 읽은 목록은 L1 에도 저장
+    assert asyncio.run(todo_cache.get(user_id=1, params="ASC:100:")) == ("3", None)
+    asyncio.run(todo_cache.set(user_id=1, generation="3", params="ASC:100:", value="[]"))
+    assert asyncio.run(todo_cache.get(user_id=1, params="ASC:100:")) == ("3", "[]")
+    assert asyncio.run(todo_cache.get_generation(user_id=1)) == "3"
+    script.assert_awaited_once()
+
+    # 다른 worker에서 무효화 메시지를 받으면 L1 에서 제거 -> 다시 Redis 조회
+    todo_cache.cache.evict("1")
+    script.return_value = ["4", None]
+    assert asyncio.run(todo_cache.get(user_id=1, params="ASC:100:")) == ("4", None)
+    # 세대 key가 없을 때의 시작 값은 0이 아니라 시각(µs) -> key가 사라져도 이전 세대가 다시 쓰이지 않음
+    assert int(script.call_args.kwargs["args"][2]) > 10**15
+
+    # 무효화 -> 세대 증가 + 알림을 pipeline 한 번으로
+    asyncio.run(todo_cache.invalidate(user_id=1))
+    pipe = redis_client.pipeline.return_value
+    assert pipe.set.call_args.args[0] == "todos:1:gen" and pipe.set.call_args.kwargs == {"nx": True}
+    pipe.incr.assert_called_once_with("todos:1:gen")
+    pipe.publish.assert_called_once_with(cache_settings.invalidation_channel, "todos:1")
+    pipe.execute.assert_awaited_once()
+
+
+def test_user_cache_tiers(redis_client, mocker):
+    redis_client.get.return_value = None
+    get_user = mocker.patch.object(
+        UserRepository, "get_user_by_username", return_value=User(id=1, username="test", password="hashed")
+    )
+    user_cache = UserCache()
+
+    user = asyncio.run(user_cache.get_user(username="test", user_repo=UserRepository(session=None)))
+    assert (user.id, user.username) == (1, "test")
+    redis_client.set.assert_called_once_with("cache:user:test", '[1, "test"]', ex=cache_settings.user_cache_redis_ttl)
+
+    user = asyncio.run(user_cache.get_user(username="test", user_repo=UserRepository(session=None)))
+    assert (user.id, user.username) == (1, "test")
+    get_user.assert_called_once()
+
+
+def test_user_cache_disabled(redis_client, mocker):
+    # CACHE_USER_CACHE_SIZE=0 -> Redis도 사용하지 않고 매번 DB 조회
+    mocker.patch.object(tiered_cache.user_lookup_cache.local, "max_size", 0)
+    get_user = mocker.patch.object(
+        UserRepository, "get_user_by_username", return_value=User(id=1, username="test", password="hashed")
+    )
+    user_cache = UserCache()
+
+    for _ in range(2):
+        user = asyncio.run(user_cache.get_user(username="test", user_repo=UserRepository(session=None)))
+        assert (user.id, user.username) == (1, "test")
+    assert get_user.call_count == 2
+    redis_client.get.assert_not_called()
+    redis_client.set.assert_not_called()
+
+
+def test_invalidation_subscriber(redis_client, mocker):
+    cache = TieredCache("test", max_size=10, ttl=60, redis_ttl=600)
+    cache.local.set("test", 1)
+    pubsub = redis_client.pubsub.return_value
+    pubsub.subscribe = mocker.AsyncMock()
+    pubsub.aclose = mocker.AsyncMock()
+    received = asyncio.Event()
+
+    async def get_message(**kwargs):
+        if not received.is_set():
+            received.set()
+            return {"data": "test:test"}
+        await asyncio.sleep(kwargs["timeout"])  # 다음 메시지 없음
+
+    pubsub.get_message = get_message
+
+    async def run():
+        subscriber = InvalidationSubscriber()
+        subscriber.start()
+        # background task 에서 메시지 수신 -> L1 제거
+        await received.wait()
+        await asyncio.sleep(0)
+        await subscriber.stop()
+
+    asyncio.run(run())
+    assert cache.local.get("test") is MISSING
+    pubsub.subscribe.assert_awaited_once_with(cache_settings.invalidation_channel)
+    pubsub.aclose.assert_awaited_once()
+
+
+def test_redis_client_lifespan():
+    # lifespan 에서 open() 하기 전에는 Redis 에러 -> cache 없이 처리
+    client = RedisClient()
+    script = client.script("return 1")
+    with pytest.raises(redis.ConnectionError):
+        client.get
+    with pytest.raises(redis.ConnectionError):
+        asyncio.run(script(keys=[], args=[]))
+
+    # open() 하면 client 생성, 앞에서 선언한 script도 등록
+    client.open(RedisSettings())
+    assert client.client.connection_pool.max_connections == RedisSettings().max_connections
+    assert script.script is not None
+    assert client.script("return 2").script is not None
+
+    asyncio.run(client.close())
+    assert script.script is None
+    with pytest.raises(redis.ConnectionError):
+        client.get
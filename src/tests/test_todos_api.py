@@ -1,4 +1,15 @@
-from database.orm import ToDo, User
+import asyncio
+import json
+from collections import namedtuple
+from datetime import date
+
+import redis
+
+import tiered_cache
+from tiered_cache import ToDoListCache, missing_todo_cache
+from config import cache_settings, todo_settings
+from etag import make_list_etag
+from database.orm import ToDo, ToDoDailyCompletion, User
 from database.repository import ToDoRepository, UserRepository
 from service.user import UserService
 
@@ -15,14 +26,17 @@ def test_get_todos(client, mocker):
     headers = {"Authorization": f"Bearer {access_token}"}
 
     user = User(id=1, username="test", password="hashed")
-    user.todos = [
-        ToDo(id=1, contents="FastAPI Section 0", is_done=True),
-        ToDo(id=2, contents="FastAPI Section 1", is_done=False),
-    ]
-
     mocker.patch.object(
         UserRepository, "get_user_by_username", return_value=user
     )
+    get_todos = mocker.patch.object(
+        ToDoRepository,
+        "get_todos_by_user_id",
+        return_value=[
+            ToDo(id=1, contents="FastAPI Section 0", is_done=True),
+            ToDo(id=2, contents="FastAPI Section 1", is_done=False),
+        ],
+    )
 
     # order=ASC
     response = client.get("/todos", headers=headers)
@@ -31,18 +45,51 @@ def test_get_todos(client, mocker):
         "todos": [
             {"id": 1, "contents": "FastAPI Section 0", "is_done": True},
             {"id": 2, "contents": "FastAPI Section 1", "is_done": False},
-        ]
+        ],
+        "next_cursor": None,
     }
+    get_todos.assert_called_with(user_id=1, order="ASC", limit=101, after_id=None)
 
-    # order=DESC
+    # order=DESC -> 정렬은 DB(ORDER BY)에서 처리
     response = client.get("/todos?order=DESC", headers=headers)
     assert response.status_code == 200
-    assert response.json() == {
-        "todos": [
-            {"id": 2, "contents": "FastAPI Section 1", "is_done": False},
-            {"id": 1, "contents": "FastAPI Section 0", "is_done": True},
-        ]
-    }
+    get_todos.assert_called_with(user_id=1, order="DESC", limit=101, after_id=None)
+
+
+def test_get_todos_pagination(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    get_todos = mocker.patch.object(
+        ToDoRepository,
+        "get_todos_by_user_id",
+        return_value=[
+            ToDo(id=1, contents="FastAPI Section 0", is_done=True),
+            ToDo(id=2, contents="FastAPI Section 1", is_done=False),
+        ],
+    )
+
+    # limit 보다 하나 더 조회되면 next_cursor 생성
+    response = client.get("/todos?limit=1", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["todos"] == [{"id": 1, "contents": "FastAPI Section 0", "is_done": True}]
+    assert body["next_cursor"] is not None
+
+    # next_cursor -> 마지막 id 다음부터 조회
+    response = client.get(f"/todos?limit=1&cursor={body['next_cursor']}", headers=headers)
+    assert response.status_code == 200
+    get_todos.assert_called_with(user_id=1, order="ASC", limit=2, after_id=1)
+
+    # 잘못된 cursor
+    response = client.get("/todos?cursor=invalid", headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid Cursor"}
 
 # PyTest Fixture : 
     # client = TestClient(app= app)의 client 객체가 여러 곳에서 사용 가능하게,
@@ -97,22 +144,15 @@ def test_create_todo(client, mocker):
 # 테스트 코드 - PATCH API (Update API)
 def test_update_todo(client, mocker):
     # 200
-    mocker.patch.object(
-        ToDoRepository,
-        "get_todo_by_todo_id", 
-        return_value = ToDo(id=1, contents="todo", is_done = True)
-        )
-    
-    undone = mocker.patch.object(ToDo, "undone")
-    mocker.patch.object(
+    update_todo = mocker.patch.object(
         ToDoRepository,
-        "update_todo", 
+        "update_todo_is_done", 
         return_value = ToDo(id=1, contents="todo", is_done = False)
         )
 
     response = client.patch("/todos/1", json={"is_done": False})
 
-    undone.assert_called_once_with()
+    update_todo.assert_called_once_with(todo_id=1, is_done=False)
 
     assert response.status_code == 200
     assert response.json() ==  {"id": 1, "is_done": False, "contents": "todo"}
@@ -120,7 +160,7 @@ def test_update_todo(client, mocker):
     # 404
     mocker.patch.object(
         ToDoRepository,
-        "get_todo_by_todo_id", 
+        "update_todo_is_done", 
         return_value = None
         )
     response = client.patch("/todos/1", json={'is_done': True})
@@ -131,23 +171,20 @@ def test_update_todo(client, mocker):
 # 테스트 코드 - DELETE API
 def test_delete_todo(client, mocker):
     # 204
-    mocker.patch.object(
-        ToDoRepository,
-        "get_todo_by_todo_id", 
-        return_value = ToDo(id=1, contents="todo", is_done = True)
-        )
-    mocker.patch.object(ToDoRepository,"delete_todo", return_value = None)
+    delete_todo = mocker.patch.object(
+        ToDoRepository, "delete_todo", return_value = ToDo(id=1, contents="todo", is_done=False, user_id=1)
+    )
+    invalidate = mocker.patch.object(ToDoListCache, "invalidate")
 
     response = client.delete("/todos/1")
     assert response.status_code == 204
+    delete_todo.assert_called_once_with(todo_id=1, with_owner=False)
+    # commit 후에 소유자의 목록 cache 무효화
+    invalidate.assert_called_once_with(user_id=1)
 
     # 404
-    mocker.patch.object(
-        ToDoRepository,
-        "get_todo_by_todo_id", 
-        return_value = None
-        )
-    response = client.get("/todos/1")
+    mocker.patch.object(ToDoRepository,"delete_todo", return_value = None)
+    response = client.delete("/todos/1")
     assert response.status_code == 404
     assert response.json() ==  {'detail' : "Todo Not Found"}
 
@@ -155,4 +192,423 @@ def test_delete_todo(client, mocker):
 
 
 ## 만약에 pytest를 함수별로 보고 싶다면,
-# pytest tests/test"main.py::test_get_todo 이런식으로 실행하면됨
\ No newline at end of file
+# pytest tests/test"main.py::test_get_todo 이런식으로 실행하면됨
+
+# 테스트 코드 - POST API (bulk)
+def test_create_todos(client, mocker):
+    create_todos = mocker.patch.object(
+        ToDoRepository,
+        "create_todos",
+        return_value=[
+            ToDo(id=1, contents="todo 1", is_done=False),
+            ToDo(id=2, contents="todo 2", is_done=True),
+        ],
+    )
+    body = [
+        {"contents": "todo 1", "is_done": False},
+        {"contents": "todo 2", "is_done": True},
+    ]
+    response = client.post("/todos/bulk", json=body)
+    assert response.status_code == 201
+    assert response.json() == [
+        {"id": 1, "contents": "todo 1", "is_done": False},
+        {"id": 2, "contents": "todo 2", "is_done": True},
+    ]
+    todos = create_todos.call_args.kwargs["todos"]
+    assert [todo.contents for todo in todos] == ["todo 1", "todo 2"]
+
+    # 최대 개수 초과 -> 413
+    mocker.patch.object(todo_settings, "bulk_max_items", 1)
+    response = client.post("/todos/bulk", json=body)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Too Many ToDos"}
+
+
+# 테스트 코드 - PATCH / DELETE API (bulk)
+def test_update_and_delete_todos(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    update_todos = mocker.patch.object(ToDoRepository, "update_todos", return_value=3)
+    delete_todos = mocker.patch.object(ToDoRepository, "delete_todos", return_value=2)
+
+    # 모두 완료 처리
+    response = client.patch(
+        "/todos", json={"filter": {"is_done": False}, "is_done": True}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"updated": 3}
+    update_todos.assert_called_once_with(user_id=1, set_is_done=True, ids=None, is_done=False)
+
+    # id 목록으로 삭제
+    response = client.request(
+        "DELETE", "/todos", json={"filter": {"ids": [1, 2]}}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 2}
+    delete_todos.assert_called_once_with(user_id=1, ids=[1, 2], is_done=None)
+
+    # 조건이 없으면 400
+    response = client.request("DELETE", "/todos", json={"filter": {}}, headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Empty Filter"}
+
+
+# 테스트 코드 - GET API (통계)
+def test_get_todo_stats(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    mocker.patch.object(ToDoRepository, "get_todo_stats", return_value={True: 3, False: 2})
+    get_daily_completions = mocker.patch.object(
+        ToDoRepository,
+        "get_daily_completions",
+        return_value=[ToDoDailyCompletion(user_id=1, day=date(2024, 1, 1), completed=3)],
+    )
+
+    response = client.get("/todos/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"total": 5, "done": 3, "pending": 2, "daily_completions": None}
+    get_daily_completions.assert_not_called()
+
+    response = client.get("/todos/stats?days=7", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["daily_completions"] == [{"day": "2024-01-01", "completed": 3}]
+
+
+# 테스트 코드 - GET API (검색)
+SearchRow = namedtuple("SearchRow", ["id", "contents", "is_done", "score"])
+
+
+def test_search_todos(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    search_todos = mocker.patch.object(
+        ToDoRepository,
+        "search_todos",
+        return_value=[
+            SearchRow(id=2, contents="FastAPI Section 1", is_done=False, score=2.0),
+            SearchRow(id=1, contents="FastAPI Section 0", is_done=True, score=1.0),
+        ],
+    )
+
+    response = client.get("/todos/search?q=FastAPI&limit=1", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["todos"] == [{"id": 2, "contents": "FastAPI Section 1", "is_done": False}]
+    search_todos.assert_called_with(user_id=1, query="FastAPI", limit=2, after=None)
+
+    response = client.get(f"/todos/search?q=FastAPI&cursor={body['next_cursor']}", headers=headers)
+    assert response.status_code == 200
+    search_todos.assert_called_with(user_id=1, query="FastAPI", limit=101, after=(2.0, 2))
+
+    # 검색어 없음 -> 422
+    response = client.get("/todos/search", headers=headers)
+    assert response.status_code == 422
+
+
+# 테스트 코드 - GET API (export, streaming)
+def test_export_todos(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+
+    async def stream_todos_by_user_id(self, user_id, batch_size):
+        yield [ToDo(id=1, contents="FastAPI Section 0", is_done=True)]
+        yield [ToDo(id=2, contents='say "hi", bye', is_done=False)]
+
+    mocker.patch.object(ToDoRepository, "stream_todos_by_user_id", stream_todos_by_user_id)
+
+    response = client.get("/todos/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.splitlines() == [
+        '{"id": 1, "contents": "FastAPI Section 0", "is_done": true}',
+        '{"id": 2, "contents": "say \\"hi\\", bye", "is_done": false}',
+    ]
+
+    response = client.get("/todos/export?format=csv", headers=headers)
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "id,contents,is_done",
+        "1,FastAPI Section 0,True",
+        '2,"say ""hi"", bye",False',
+    ]
+
+    response = client.get("/todos/export?format=xml", headers=headers)
+    assert response.status_code == 422
+
+
+# 테스트 코드 - POST API (import, streaming)
+def test_import_todos(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    mocker.patch.object(todo_settings, "import_batch_size", 2)
+    inserted = []
+
+    async def insert_todo_rows(self, rows):
+        inserted.append(rows)
+        return len(rows)
+
+    mocker.patch.object(ToDoRepository, "insert_todo_rows", insert_todo_rows)
+
+    def body():
+        # chunk 경계가 줄 중간에 걸리도록 나눠서 보냄
+        yield b'{"contents": "todo 1", "is_done": false}\n{"contents": "to'
+        yield b'do 2", "is_done": true}\nnot json\n\n{"contents": "todo 3"}\n'
+        yield b'{"contents": "todo 4", "is_done": false}'
+
+    response = client.post("/todos/import", content=body(), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 3
+    assert response.json()["failed"] == 2
+    assert [error["line"] for error in response.json()["errors"]] == [3, 5]
+    assert [[row["contents"] for row in rows] for rows in inserted] == [
+        ["todo 1", "todo 2"], ["todo 4"]
+    ]
+    assert inserted[0][0] == {"contents": "todo 1", "is_done": False, "user_id": 1}
+
+    # csv (export 결과를 그대로 import 가능, 따옴표 안의 줄바꿈 포함)
+    inserted.clear()
+    body = 'id,contents,is_done\r\n1,"multi\r\nline",True\r\n2,"say ""hi""",false\r\n3,bad,maybe\r\n'
+    response = client.post("/todos/import?format=csv", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+    assert response.json()["failed"] == 1
+    assert [row["contents"] for rows in inserted for row in rows] == ["multi\nline", 'say "hi"']
+
+
+def test_import_todos_limits(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    inserted = []
+
+    async def insert_todo_rows(self, rows):
+        inserted.extend(row["contents"] for row in rows)
+        return len(rows)
+
+    mocker.patch.object(ToDoRepository, "insert_todo_rows", insert_todo_rows)
+
+    # 너무 긴 줄(줄바꿈 없이 계속 들어오는 body 포함), 컬럼 길이를 넘는 contents -> 그 줄만 에러
+    def body():
+        yield b'{"contents": "todo 1", "is_done": false}\n{"contents": "'
+        yield b"x" * 100
+        yield b'", "is_done": false}\n{"contents": "todo 3", "is_done": false}\n'
+        yield b'{"contents": "' + b"y" * 300 + b'", "is_done": false}'
+
+    mocker.patch.object(todo_settings, "import_max_line_length", 512)
+    response = client.post("/todos/import", content=body(), headers=headers)
+    assert response.json()["imported"] == 3
+    assert inserted == ["todo 1", "x" * 100, "todo 3"]
+    errors = response.json()["errors"]
+    assert [error["line"] for error in errors] == [4]
+    assert "at most 256 characters" in errors[0]["error"]
+
+    inserted.clear()
+    mocker.patch.object(todo_settings, "import_max_line_length", 64)
+    response = client.post("/todos/import", content=body(), headers=headers)
+    assert inserted == ["todo 1", "todo 3"]
+    assert response.json()["errors"] == [
+        {"line": 2, "error": "line too long"}, {"line": 4, "error": "line too long"}
+    ]
+
+    # csv : 닫히지 않은 따옴표 -> 그 record만 에러, 이후 줄부터 다시 읽음
+    inserted.clear()
+    rows = "".join(f"{i},todo {i},false\n" for i in range(3, 100))
+    body = 'id,contents,is_done\n2,"unterminated,false\n' + rows
+    response = client.post("/todos/import?format=csv", content=body, headers=headers)
+    assert response.json()["errors"] == [{"line": 2, "error": "line too long"}]
+    assert response.json()["failed"] == 1
+    assert inserted[-1] == "todo 99" and len(inserted) > 90
+
+
+def test_get_todos_cache(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    get_todos = mocker.patch.object(
+        ToDoRepository,
+        "get_todos_by_user_id",
+        return_value=[ToDo(id=1, contents="FastAPI Section 0", is_done=True)],
+    )
+
+    # cache miss -> DB(primary) 조회 후 조회할 때 읽은 세대로 저장
+    mocker.patch.object(ToDoListCache, "get", return_value=("3", None))
+    cache_set = mocker.patch.object(ToDoListCache, "set")
+    read_from_primary = mocker.patch.object(ToDoRepository, "read_from_primary")
+    response = client.get("/todos?order=DESC", headers=headers)
+    assert response.status_code == 200
+    cache_set.assert_called_once_with(
+        user_id=1, generation="3", params="DESC:100:", value=json.dumps(response.json())
+    )
+    read_from_primary.assert_called_once()
+
+    # cache hit -> DB 조회 없이 저장된 JSON 그대로 응답
+    get_todos.reset_mock()
+    cached = '{"todos": [{"id": 2, "contents": "cached", "is_done": false}], "next_cursor": null}'
+    mocker.patch.object(ToDoListCache, "get", return_value=("3", cached))
+    response = client.get("/todos?order=DESC", headers=headers)
+    assert response.json()["todos"] == [{"id": 2, "contents": "cached", "is_done": False}]
+    get_todos.assert_not_called()
+
+
+def test_todo_list_cache_invalidate(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    invalidate = mocker.patch.object(ToDoListCache, "invalidate")
+
+    mocker.patch.object(
+        ToDoRepository, "update_todo_is_done", return_value=ToDo(id=1, contents="todo", is_done=True, user_id=1)
+    )
+    client.patch("/todos/1", json={"is_done": True})
+    invalidate.assert_called_once_with(user_id=1)
+
+    # 바뀐 todo가 없으면 무효화하지 않음
+    invalidate.reset_mock()
+    mocker.patch.object(ToDoRepository, "update_todos", return_value=0)
+    client.patch("/todos", json={"filter": {"is_done": False}, "is_done": True}, headers=headers)
+    invalidate.assert_not_called()
+
+    mocker.patch.object(ToDoRepository, "delete_todos", return_value=2)
+    client.request("DELETE", "/todos", json={"filter": {"ids": [1, 2]}}, headers=headers)
+    invalidate.assert_called_once_with(user_id=1)
+
+
+def test_todo_list_cache_redis_error(mocker):
+    # Redis에 문제가 있으면 cache 없이 처리 (에러 수만 기록)
+    mocker.patch.object(cache_settings, "enabled", True)
+    mocker.patch.object(tiered_cache, "_GET_TODO_LIST", side_effect=redis.ConnectionError)
+    mocker.patch.object(redis.asyncio.client.Pipeline, "execute", side_effect=redis.ConnectionError)
+    todo_cache = ToDoListCache()
+    errors: int = todo_cache.metrics.errors
+
+    assert asyncio.run(todo_cache.get(user_id=1, params="ASC:100:")) == (None, None)
+    asyncio.run(todo_cache.invalidate(user_id=1))
+    assert todo_cache.metrics.errors == errors + 2
+
+
+def test_get_todos_etag(client, mocker):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    get_todos = mocker.patch.object(ToDoRepository, "get_todos_by_user_id", return_value=[])
+    mocker.patch.object(ToDoListCache, "get", return_value=("3", None))
+    mocker.patch.object(ToDoListCache, "set")
+
+    response = client.get("/todos", headers=headers)
+    etag = response.headers["ETag"]
+    assert etag == make_list_etag(user_id=1, generation="3", params="ASC:100:")
+
+    # 같은 세대 -> 304, DB 조회 없음
+    get_todos.reset_mock()
+    response = client.get("/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    get_todos.assert_not_called()
+
+    # 쓰기가 있어서 세대가 바뀜 -> 200
+    mocker.patch.object(ToDoListCache, "get", return_value=("4", None))
+    response = client.get("/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_todo_etag(client, mocker):
+    get_todo = mocker.patch.object(
+        ToDoRepository,
+        "get_todo_by_todo_id",
+        return_value=ToDo(id=1, contents="todo", is_done=False, user_id=7),
+    )
+    get_generation = mocker.patch.object(ToDoListCache, "get_generation", return_value="3")
+
+    # 소유자를 모름 -> 소유자 확인, 세대 조회 후 다시 읽음 (세대보다 오래된 내용에 ETag가 붙지 않도록)
+    response = client.get("/todos/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag == '"todo-1-7-3"'
+    assert get_todo.call_count == 2
+
+    # 소유자의 세대가 그대로면 304, DB 조회 없음
+    get_todo.reset_mock()
+    response = client.get("/todos/1", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    get_todo.assert_not_called()
+    get_generation.assert_called_with(user_id=7)
+
+    # 다른 todo의 ETag는 무시
+    response = client.get("/todos/2", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    # 세대가 바뀜 -> 200, ETag의 소유자로 세대를 먼저 읽었으므로 todo는 한 번만 읽음
+    get_generation.return_value = "4"
+    get_todo.reset_mock()
+    response = client.get("/todos/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"todo-1-7-4"'
+    get_todo.assert_called_once_with(todo_id=1)
+
+    # Redis를 사용할 수 없으면 ETag 없이 응답
+    get_generation.return_value = None
+    response = client.get("/todos/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_get_todo_negative_cache(client, mocker, local_cache_only):
+    get_todo = mocker.patch.object(ToDoRepository, "get_todo_by_todo_id", return_value=None)
+    read_from_primary = mocker.patch.object(ToDoRepository, "read_from_primary")
+
+    # 없는 todo -> primary에서 다시 확인 후 저장, 두 번째 조회부터는 DB 조회 없이 404
+    assert client.get("/todos/1").status_code == 404
+    assert client.get("/todos/1").status_code == 404
+    assert get_todo.call_count == 2
+    read_from_primary.assert_called_once_with()
+    assert missing_todo_cache.to_dict()["negative_hits"] == 1
+
+    # 같은 id로 생성되면 "없음" cache에서 제거
+    mocker.patch.object(
+        ToDoRepository, "create_todo", return_value=ToDo(id=1, contents="todo", is_done=False)
+    )
+    client.post("/todos", json={"contents": "todo", "is_done": False})
+    get_todo.return_value = ToDo(id=1, contents="todo", is_done=False)
+    assert client.get("/todos/1").status_code == 200
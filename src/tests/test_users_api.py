@@ -1,6 +1,10 @@
+import time
+
+from cache import MISSING, LocalCache
 from service.user import UserService
 from database.orm import User
-from database.repository import UserRepository
+from database.repository import ToDoRepository, UserRepository
+from tiered_cache import missing_user_cache
 
 
 def test_user_sign_up(client, mocker):
@@ -36,4 +40,94 @@ def test_user_sign_up(client, mocker):
     )
 
     assert response.status_code == 201
-    assert response.json() == {'id':1, "username":'test'}
\ No newline at end of file
+    assert response.json() == {'id':1, "username":'test'}
+
+def test_user_cache(client, mocker, local_cache_only):
+    access_token: str = UserService().create_jwt(username="test")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    get_user = mocker.patch.object(
+        UserRepository,
+        "get_user_by_username",
+        return_value=User(id=1, username="test", password="hashed"),
+    )
+    mocker.patch.object(ToDoRepository, "get_todos_by_user_id", return_value=[])
+
+    # 두 번째 요청부터는 DB에서 user를 조회하지 않음
+    client.get("/todos", headers=headers)
+    client.get("/todos", headers=headers)
+    get_user.assert_called_once_with(username="test")
+
+    # user가 저장되면 cache에서 제거
+    mocker.patch.object(UserService, "hash_password", return_value="hashed")
+    mocker.patch.object(
+        UserRepository, "save_user", return_value=User(id=1, username="test", password="hashed")
+    )
+    client.post("/users/sign-up", json={"username": "test", "password": "plain"})
+    client.get("/todos", headers=headers)
+    assert get_user.call_count == 2
+
+
+def test_local_cache(mocker):
+    now = mocker.patch.object(time, "monotonic", return_value=100.0)
+    cache = LocalCache(max_size=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # 최대 개수를 넘으면 가장 오래 사용하지 않은 key부터 밀려남
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+
+    # TTL이 지나면 없는 것으로 처리
+    now.return_value = 161.0
+    assert cache.get("c") is MISSING
+
+    assert cache.to_dict() | {"hit_rate": None} == {
+        "hits": 2, "misses": 2, "errors": 0, "invalidations": 0, "evictions": 1,
+        "hit_rate": None, "size": 1, "max_size": 2, "ttl": 60,
+    }
+
+
+def test_log_in_negative_cache(client, mocker, local_cache_only):
+    get_user = mocker.patch.object(UserRepository, "get_user_by_username", return_value=None)
+    read_from_primary = mocker.patch.object(UserRepository, "read_from_primary")
+    body = {"username": "unknown", "password": "plain"}
+
+    # 없는 username -> primary에서 다시 확인 후 저장, 두 번째 로그인 시도부터는 DB 조회 없이 404
+    assert client.post("/users/log-in", json=body).status_code == 404
+    assert client.post("/users/log-in", json=body).status_code == 404
+    assert get_user.call_count == 2
+    read_from_primary.assert_called_once_with()
+
+    # 가입하면 "없음" cache에서 제거
+    mocker.patch.object(UserService, "hash_password", return_value="hashed")
+    mocker.patch.object(
+        UserRepository, "save_user", return_value=User(id=1, username="unknown", password="hashed")
+    )
+    client.post("/users/sign-up", json=body)
+    assert client.post("/users/log-in", json=body).status_code == 404
+    assert get_user.call_count == 4
+
+
+def test_log_in_cache_disabled(client, mocker):
+    # CACHE_ENABLED=false -> 다른 worker의 무효화를 받을 수 없으므로 "없음" cache도 사용하지 않음
+    get_user = mocker.patch.object(UserRepository, "get_user_by_username", return_value=None)
+    body = {"username": "unknown", "password": "plain"}
+
+    assert client.post("/users/log-in", json=body).status_code == 404
+    assert client.post("/users/log-in", json=body).status_code == 404
+    assert get_user.call_count == 2
+    assert missing_user_cache.to_dict()["size"] == 0
+
+
+def test_user_sign_up_duplicate(sqlite_client):
+    # username unique index 위반 -> 500 이 아니라 409
+    body = {"username": "test", "password": "plain"}
+    assert sqlite_client.post("/users/sign-up", json=body).status_code == 201
+    response = sqlite_client.post("/users/sign-up", json=body)
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Username Already Exists"}
+
+    # rollback 후에도 처음 가입한 user로 로그인 가능
+    assert sqlite_client.post("/users/log-in", json=body).status_code == 200
@@ -0,0 +1,435 @@
+# 2단계 cache : L1 (worker 메모리, LocalCache) -> L2 (Redis) -> DB
+# L1 hit 이면 network 왕복도 없음
+# uvicorn worker가 여러 개라서 한 worker에서 무효화하면 Redis pub/sub 으로 다른 worker의 L1 에서도 지움
+#
+# pub/sub 메시지를 놓치는 경우(Redis 재연결 등)를 대비해 L1 TTL은 짧게 (CACHE_LOCAL_TTL)
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+import redis
+
+from cache import MISSING, CacheMetrics, LocalCache, redis_client
+from config import cache_settings
+from database.orm import User
+from single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# namespace -> TieredCache (무효화 메시지를 받았을 때 찾기 위해)
+_caches: Dict[str, "TieredCache"] = {}
+
+
+# redis_ttl=None 이면 L2 없이 L1만 사용 (무효화 메시지는 똑같이 주고받음)
+class TieredCache:
+    def __init__(self, namespace: str, max_size: int, ttl: float, redis_ttl: int | None):
+        self.namespace: str = namespace
+        self.local = LocalCache(max_size=max_size, ttl=ttl)  # L1
+        self.redis_ttl: int | None = redis_ttl  # L2
+        self.metrics = CacheMetrics()  # L2 사용 현황
+        # 무효화가 일어날 때마다 증가, key 별로 마지막 무효화 때의 값을 기록
+        # L2/DB에서 읽는 동안 "그 key"가 무효화되었으면 읽은 값을 L1에 넣지 않음 (지워진 값이 다시 들어가는 것을 막음)
+        # 기록은 max_size 개까지, 밀려난 key와 "*"(전체 무효화)는 _invalidated_floor 로 (그 이전에 읽은 값은 모두 버림)
+        self.sequence: int = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._invalidated_floor: int = 0
+        _caches[namespace] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    # key가 마지막으로 무효화되었을 때의 sequence
+    def version(self, key: str) -> int:
+        return max(self._invalidated_floor, self._invalidated.get(key, 0))
+
+    # sequence(읽기 시작할 때의 self.sequence) 이후에 key가 무효화되었는지
+    def is_stale(self, key: str, sequence: int) -> bool:
+        return self.version(key) > sequence
+
+    # CACHE_ENABLED=false 이면 L1 도 사용하지 않음 (무효화 메시지를 주고받지 않으므로 다른 worker의 쓰기를 알 수 없음)
+    def set_local(self, key: str, value: Any, sequence: int) -> None:
+        if cache_settings.enabled and not self.is_stale(key, sequence):
+            self.local.set(key, value)
+
+    # 이 worker의 L1 에서만 제거 (다른 worker의 무효화 메시지를 받았을 때)
+    # key가 "*" 이면 전체 제거
+    def evict(self, key: str) -> None:
+        self.sequence += 1
+        if key == "*":
+            self._invalidated.clear()
+            self._invalidated_floor = self.sequence
+            self.local.clear()
+            return
+        self._invalidated[key] = self.sequence
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > max(self.local.max_size, 1):
+            _, sequence = self._invalidated.popitem(last=False)
+            self._invalidated_floor = max(self._invalidated_floor, sequence)
+        self.local.delete(key)
+
+    async def get(self, key: str) -> Any:
+        if not cache_settings.enabled:
+            return MISSING
+        value: Any = self.local.get(key)
+        if value is not MISSING or not self.redis_ttl:
+            return value
+        sequence: int = self.sequence
+        try:
+            cached: str | None = await redis_client.get(self._redis_key(key))
+        except redis.RedisError:
+            self.metrics.errors += 1
+            logger.warning("%s cache get failed", self.namespace, exc_info=True)
+            return MISSING
+        if cached is None:
+            self.metrics.misses += 1
+            return MISSING
+        self.metrics.hits += 1
+        value = json.loads(cached)
+        self.set_local(key, value, sequence)
+        return value
+
+    # sequence : 값을 읽기 시작할 때의 self.sequence
+    async def set(self, key: str, value: Any, sequence: int) -> None:
+        self.set_local(key, value, sequence)
+        if not cache_settings.enabled or not self.redis_ttl or self.is_stale(key, sequence):
+            return
+        try:
+            await redis_client.set(self._redis_key(key), json.dumps(value), ex=self.redis_ttl)
+        except redis.RedisError:
+            self.metrics.errors += 1
+            logger.warning("%s cache set failed", self.namespace, exc_info=True)
+
+    async def invalidate(self, key: str) -> None:
+        self.evict(key)
+        if not cache_settings.enabled:
+            return
+        # L2 삭제 + 다른 worker에 알림을 한 번의 round-trip으로
+        def build(pipe) -> None:
+            if self.redis_ttl:
+                pipe.delete(self._redis_key(key))
+            pipe.publish(cache_settings.invalidation_channel, f"{self.namespace}:{key}")
+
+        await _execute_invalidation(self, build)
+
+    # 모든 worker의 L1 전체 제거 (L2 key는 찾아서 지울 수 없으므로 L1만 쓰는 cache에서 사용)
+    async def clear(self) -> None:
+        await self.invalidate("*")
+
+    def to_dict(self) -> dict:
+        return {"local": self.local.to_dict(), "redis": self.metrics.to_dict()}
+
+
+# build : pipeline 에 명령을 쌓는 함수
+async def _execute_invalidation(cache: TieredCache, build: Callable[[Any], None]) -> None:
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        build(pipe)
+        await pipe.execute()
+        cache.metrics.invalidations += 1
+    except redis.RedisError:
+        cache.metrics.errors += 1
+        logger.warning("%s cache invalidate failed", cache.namespace, exc_info=True)
+
+
+# 다른 worker가 보낸 무효화 메시지를 받아서 L1 에서 제거
+# app lifespan 동안 background task로 실행, 연결이 끊어지면 다시 연결해서 구독
+# (끊어진 동안의 메시지는 놓치므로 L1 TTL이 지나야 반영됨)
+class InvalidationSubscriber:
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    @staticmethod
+    def on_message(message: dict) -> None:
+        namespace, _, key = message["data"].partition(":")
+        cache: TieredCache | None = _caches.get(namespace)
+        if cache is not None:
+            cache.evict(key)
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(cache_settings.invalidation_channel)
+                while True:
+                    # timeout 안에 메시지가 없으면 None (socket_timeout 에러 없이 계속 대기)
+                    message: dict | None = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        self.on_message(message)
+            except redis.RedisError as e:
+                logger.warning("cache invalidation subscriber error: %s", e)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+            await asyncio.sleep(1)
+
+
+invalidation_subscriber = InvalidationSubscriber()
+
+
+# ---------------------------------------------------------------------------
+# Negative cache : "없음" 결과를 짧게 저장 (삭제된 todo id 재조회, 없는 username 으로 로그인 시도 등)
+# -> 404 응답 전에 DB를 조회하지 않음
+# 생성되면 바로 사라져야 하므로 TTL은 짧게, L2(Redis) 없이 worker 메모리에만 저장하고 무효화는 pub/sub 으로 전달
+class NegativeCache:
+    def __init__(self, namespace: str):
+        self.cache = TieredCache(
+            namespace,
+            max_size=cache_settings.negative_cache_size,
+            ttl=cache_settings.negative_cache_ttl,
+            redis_ttl=None,
+        )
+
+    @property
+    def sequence(self) -> int:
+        return self.cache.sequence
+
+    def is_missing(self, key: str) -> bool:
+        return cache_settings.enabled and self.cache.local.get(key) is not MISSING
+
+    # sequence : DB를 조회하기 전의 self.sequence (조회하는 동안 생성되었으면 저장하지 않음)
+    # replica에서 "없음"을 읽었으면 lag 때문일 수 있으므로 primary에서 다시 확인한 후에 저장
+    def set_missing(self, key: str, sequence: int) -> None:
+        self.cache.set_local(key, True, sequence)
+
+    async def invalidate(self, key: str) -> None:
+        await self.cache.invalidate(key)
+
+    async def clear(self) -> None:
+        await self.cache.clear()
+
+    def to_dict(self) -> dict:
+        stats: dict = self.cache.local.to_dict()
+        return {"negative_hits": stats.pop("hits"), **stats}
+
+
+missing_todo_cache = NegativeCache("todo-missing")
+missing_user_cache = NegativeCache("user-missing")
+
+
+# ---------------------------------------------------------------------------
+# 사용자별 todo 목록(GET /todos 응답 JSON) cache
+# L2 (Redis)
+#   todos:{user_id}:gen                                 -> 세대 번호 (쓰기가 있을 때마다 INCR)
+#     처음에는 0이 아니라 현재 시각(µs)에서 시작 -> Redis 재시작, eviction 으로 key가 사라져도
+#     이전과 같은 세대(= 같은 ETag)가 다른 내용에 다시 쓰이지 않음
+#   todos:{user_id}:list:{gen}:{order}:{limit}:{cursor} -> 응답 JSON (TTL)
+#   세대가 바뀌면 이전 세대의 key는 더 이상 조회되지 않고 TTL로 사라짐 -> 무효화는 INCR 한 번, key를 찾아 지우지 않음
+# L1 (worker 메모리)
+#   user_id -> (세대, {query parameter: 응답 JSON})  -> 무효화되면 user 단위로 제거
+#
+# Redis에 문제가 있으면 cache 없이(DB에서) 처리
+todo_list_cache = TieredCache(
+    "todos",
+    max_size=cache_settings.todo_list_local_size,
+    ttl=cache_settings.local_ttl,
+    redis_ttl=cache_settings.todo_list_ttl,
+)
+
+# user 한 명에 대해 L1 에 보관하는 목록(query parameter 조합) 수
+TODO_LIST_LOCAL_PAGES: int = 16
+
+# 세대(generation) 조회 + 해당 세대의 목록 조회를 한 번의 round-trip으로
+# KEYS[1] : 세대 key, ARGV[1] / ARGV[2] : 목록 key의 앞 / 뒤 (사이에 세대가 들어감), ARGV[3] : 세대가 없을 때 시작 값
+_GET_TODO_LIST = redis_client.script("""
+local generation = redis.call('GET', KEYS[1])
+if not generation then
+    generation = ARGV[3]
+    redis.call('SET', KEYS[1], generation)
+end
+return {generation, redis.call('GET', ARGV[1] .. generation .. ARGV[2])}
+""")
+
+# 세대 번호만 조회 (없으면 ARGV[1] 로 시작)
+_GET_GENERATION = redis_client.script("""
+local generation = redis.call('GET', KEYS[1])
+if not generation then
+    generation = ARGV[1]
+    redis.call('SET', KEYS[1], generation)
+end
+return generation
+""")
+
+
+# 세대의 시작 값 : 이전에 사용한 세대(이전 시작 값 + 쓰기 횟수)보다 큰 값
+def _generation_seed() -> str:
+    return str(time.time_ns() // 1000)
+
+
+class ToDoListCache:
+    def __init__(self):
+        self.cache = todo_list_cache
+        self.metrics = todo_list_cache.metrics
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"todos:{user_id}:gen"
+
+    @staticmethod
+    def _list_key_prefix(user_id: int) -> str:
+        return f"todos:{user_id}:list:"
+
+    # L2 에서 읽은 세대로 L1 항목 생성 (목록이 있으면 같이)
+    def _set_local(
+        self, user_id: int, generation: str, params: str | None, value: str | None, sequence: int
+    ) -> None:
+        entry: Tuple[str, Dict[str, str]] | Any = self.cache.local.peek(str(user_id))
+        pages: Dict[str, str] = {}
+        if entry is not MISSING and entry[0] == generation:
+            pages = entry[1]
+        if params is not None and len(pages) < TODO_LIST_LOCAL_PAGES:
+            pages[params] = value
+        self.cache.set_local(str(user_id), (generation, pages), sequence)
+
+    # DB에서 읽은 목록은 같은 세대의 L1 항목이 아직 있을 때만 추가
+    # (get 이후에 무효화되었으면 항목이 지워졌으므로 추가하지 않음)
+    def _add_local_page(self, user_id: int, generation: str, params: str, value: str) -> None:
+        entry: Tuple[str, Dict[str, str]] | Any = self.cache.local.peek(str(user_id))
+        if entry is not MISSING and entry[0] == generation and len(entry[1]) < TODO_LIST_LOCAL_PAGES:
+            entry[1][params] = value
+
+    # (세대, cache된 JSON) -> 세대가 None 이면 cache를 사용할 수 없음
+    async def get(self, user_id: int, params: str) -> Tuple[str | None, str | None]:
+        if not cache_settings.enabled:
+            return None, None
+        entry: Tuple[str, Dict[str, str]] | Any = self.cache.local.get(str(user_id))
+        if entry is not MISSING and params in entry[1]:
+            return entry[0], entry[1][params]
+        sequence: int = self.cache.sequence
+        try:
+            generation, cached = await _GET_TODO_LIST(
+                keys=[self._generation_key(user_id)],
+                args=[self._list_key_prefix(user_id), f":{params}", _generation_seed()],
+            )
+        except redis.RedisError:
+            self.metrics.errors += 1
+            logger.warning("todo list cache get failed", exc_info=True)
+            return None, None
+        if cached is None:
+            self.metrics.misses += 1
+            self._set_local(user_id, generation, None, None, sequence)
+        else:
+            self.metrics.hits += 1
+            self._set_local(user_id, generation, params, cached, sequence)
+        return generation, cached
+
+    # 세대 번호만 조회 (ETag 확인용), 사용할 수 없으면 None
+    async def get_generation(self, user_id: int) -> str | None:
+        if not cache_settings.enabled:
+            return None
+        entry: Tuple[str, Dict[str, str]] | Any = self.cache.local.get(str(user_id))
+        if entry is not MISSING:
+            return entry[0]
+        sequence: int = self.cache.sequence
+        try:
+            generation: str = await _GET_GENERATION(
+                keys=[self._generation_key(user_id)], args=[_generation_seed()]
+            )
+        except redis.RedisError:
+            self.metrics.errors += 1
+            logger.warning("todo list cache get generation failed", exc_info=True)
+            return None
+        self._set_local(user_id, generation, None, None, sequence)
+        return generation
+
+    # 조회할 때 읽은 세대로 저장 -> 그 사이에 쓰기가 있었다면 이미 지난 세대라 조회되지 않음
+    async def set(self, user_id: int, generation: str, params: str, value: str) -> None:
+        if not cache_settings.enabled:
+            return
+        self._add_local_page(user_id, generation, params, value)
+        key: str = f"{self._list_key_prefix(user_id)}{generation}:{params}"
+        try:
+            await redis_client.set(key, value, ex=cache_settings.todo_list_ttl)
+        except redis.RedisError:
+            self.metrics.errors += 1
+            logger.warning("todo list cache set failed", exc_info=True)
+
+    async def invalidate(self, user_id: int) -> None:
+        self.cache.evict(str(user_id))
+        if not cache_settings.enabled:
+            return
+        # 세대 증가 + 다른 worker에 알림을 한 번의 round-trip으로 (세대가 없으면 시작 값부터)
+        def build(pipe) -> None:
+            pipe.set(self._generation_key(user_id), _generation_seed(), nx=True)
+            pipe.incr(self._generation_key(user_id))
+            pipe.publish(cache_settings.invalidation_channel, f"{self.cache.namespace}:{user_id}")
+
+        await _execute_invalidation(self.cache, build)
+
+
+# ---------------------------------------------------------------------------
+# 인증된 요청의 username -> user 조회 cache
+# access token을 decode 할 때마다 DB에서 user를 조회하지 않음
+# 인증에 필요한 정보(id, username)만 저장 (password hash 등은 저장하지 않음)
+# user가 저장(sign-up 등)되면 commit 후에 invalidate
+user_lookup_cache = TieredCache(
+    "user",
+    max_size=cache_settings.user_cache_size,
+    ttl=cache_settings.user_cache_ttl,
+    redis_ttl=cache_settings.user_cache_redis_ttl,
+)
+
+
+# username으로 user 조회, 없으면 primary에서 다시 확인한 후 "없음" cache에 저장
+# (다른 worker에서 방금 sign-up 한 user가 replica에 아직 없을 수 있음)
+async def find_user(username: str, user_repo) -> User | None:
+    if missing_user_cache.is_missing(username):
+        return None
+    missing_sequence: int = missing_user_cache.sequence
+    user: User | None = await user_repo.get_user_by_username(username=username)
+    if user is None and cache_settings.enabled:
+        user_repo.read_from_primary()
+        user = await user_repo.get_user_by_username(username=username)
+        if user is None:
+            missing_user_cache.set_missing(username, missing_sequence)
+    return user
+
+
+class UserCache:
+    def __init__(self):
+        self.cache = user_lookup_cache
+
+    async def get_user(self, username: str, user_repo) -> User | None:
+        if missing_user_cache.is_missing(username):
+            return None
+        # CACHE_ENABLED=false, CACHE_USER_CACHE_SIZE=0 -> L1, L2 모두 사용하지 않고 매번 DB 조회
+        if not cache_settings.enabled or self.cache.local.max_size <= 0:
+            return await find_user(username=username, user_repo=user_repo)
+        sequence: int = self.cache.sequence
+        principal: list | Any = await self.cache.get(username)
+        if principal is MISSING:
+            async def load_principal() -> list | None:
+                user: User | None = await find_user(username=username, user_repo=user_repo)
+                if user is None:
+                    return None
+                await self.cache.set(username, [user.id, user.username], sequence)
+                return [user.id, user.username]
+
+            # 같은 username의 동시 조회는 DB 조회 한 번 (그 username이 무효화되었으면 version이 달라져서 새로 조회)
+            principal = await single_flight.do(key=f"user:{self.cache.version(username)}:{username}", func=load_principal)
+        if principal is None:
+            return None
+        user_id, username = principal
+        return User(id=user_id, username=username)
+
+    async def invalidate(self, username: str) -> None:
+        await self.cache.invalidate(username)
+        await missing_user_cache.invalidate(username)
+